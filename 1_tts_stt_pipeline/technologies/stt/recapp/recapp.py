@@ -1,13 +1,17 @@
 from utils.setup_helper import SetupHelper
 from utils.mongodb_handler import MongoDBHandler
+from technologies.stt.recapp.recapp_client import RecappClient
+from technologies.stt.stt_engine import STTEngine
 import os
-import subprocess
 import json
 import time
+import asyncio
+import threading
 from enum import Enum
 from pathlib import Path
+from collections import deque, Counter
 
-class TTSRecapp:
+class TTSRecapp(STTEngine):
     class TranscriptionStatus:
         # Enum for Status on Request Sending
         class SentStatus(Enum):
@@ -28,7 +32,13 @@ class TTSRecapp:
             COMPLETED = 2
             FAILED = 3
 
+    CONST_TECHNOLOGY = "recapp"
+    CONST_IS_LOCAL = False # Transcription runs on the Recapp server
     CONST_ERROR_HTTP_RESULT = "Error in processing404"
+    CONST_TARGET_IN_FLIGHT = 4 # How many jobs are kept on the server at once
+    CONST_POLL_INTERVAL = 30 # Seconds between checks of the server queue
+    CONST_MAX_BACKOFF = 600 # Longest pause in seconds, if the server is overloaded
+    CONST_CLOSE_TIMEOUT = 10 # Seconds to wait for the connection pool to close
     
     def __init__(self):
         """Initialize TTS Recapp by loading the config file and establishing a MongoDB Connection
@@ -39,11 +49,46 @@ class TTSRecapp:
         self.api = self.recapp_config['api']
         self.token = self.recapp_config['token']
         self.model = self.recapp_config['model']
+        self.client = RecappClient(self.api, self.token, self.recapp_config['max_connections'], self.recapp_config['max_retries'])
+        # Event loop in the background, keeping the connection pool alive between calls (also inside Jupyter)
+        self.loop = asyncio.new_event_loop()
+        self.loopThread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.loopThread.start()
+    
+    def close(self):
+        """Close the connection pool, stop the background event loop and release the MongoDB client.
+        Call it when done with the instance, at interpreter shutdown the loop thread may already be gone.
+        """
+        # __init__ may have failed before any of these were set
+        loop = getattr(self, "loop", None)
+        loopThread = getattr(self, "loopThread", None)
+        client = getattr(self, "client", None)
+        if loop is not None and loop.is_running() and loopThread is not None and loopThread.is_alive():
+            if client is not None:
+                try:
+                    asyncio.run_coroutine_threadsafe(client.close(), loop).result(timeout=self.CONST_CLOSE_TIMEOUT)
+                except Exception as e:
+                    print(f"Error while closing the Recapp client: {e}")
+            loop.call_soon_threadsafe(loop.stop)
+        mongodb_handler = getattr(self, "mongodb_handler", None)
+        if mongodb_handler is not None:
+            mongodb_handler.disconnectMongoDB()
     
     def __del__(self):
         """Destructor
         """
-        self.mongodb_handler.disconnectMongoDB()
+        self.close()
+    
+    def runAsync(self, coroutine):
+        """Run a coroutine on the background event loop and wait for its result
+
+        Args:
+            coroutine (Any): Coroutine to run
+
+        Returns:
+            Any: Result of the coroutine
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
     
     def checkIfFileProcessed(self):
         """To Check, which files have not been processed by the server.
@@ -52,93 +97,294 @@ class TTSRecapp:
             "sentStatus": self.TranscriptionStatus.SentStatus.DELIVERED.value, 
             "serverStatus": self.TranscriptionStatus.ServerStatus.REJECTED.value
             }
-        allRejectedRequests = list(self.mongodb_handler.searchByQuery(query))
+        # Index rejected requests by filename to check each file in one lookup
+        allRejectedFiles = {str(item["fileName"]) for item in self.mongodb_handler.searchByQuery(query)}
         
         for dialog_file in Path(self.getSourceFolderPath()).iterdir():
             if dialog_file.is_file() and dialog_file.suffix.lower() == ".wav":
                 file = str(os.path.basename(dialog_file))
-                found = False
-                for item in allRejectedRequests:
-                    itemName = str(item["fileName"])
-                    if (file == itemName):
-                        found = True
-                if found:
+                if file in allRejectedFiles:
                     print(f"Item found in DB for {file}")
                 else:
                     print(f"INFO: No Item found in DB for {file}")
                         
     def checkForUpdatesOnServer(self):
         """Check if there are any Updates on the Recapp Server
+
+        Returns:
+            dict: Number of requests per status transition
         """
+        ServerStatus = self.TranscriptionStatus.ServerStatus
         # Checking for items in MongoDB if the Server Status is still pending
         query = {
             "sentStatus": self.TranscriptionStatus.SentStatus.DELIVERED.value, 
             "serverStatus": {"$in": 
-                [self.TranscriptionStatus.ServerStatus.PENDING.value,
-                 self.TranscriptionStatus.ServerStatus.RUNNING.value]
+                [ServerStatus.PENDING.value,
+                 ServerStatus.RUNNING.value]
                 }
             }
         allUnfinishedRequests = self.mongodb_handler.searchByQuery(query)
         serverJobs = self.getAllJobsOnServer("jobs")
-        allJobsOnServer = json.loads(serverJobs)
+        if serverJobs is None:
+            print("Could not fetch jobs from the Recapp server")
+            return {}
+        # Index the jobs on the server by their ID to match every request with one lookup
+        serverStatusByTask = {serverJob["id"]: serverJob["status"] for serverJob in json.loads(serverJobs)}
         
+        operations = []
+        transitions = Counter()
         for request in allUnfinishedRequests:
-            for serverJob in allJobsOnServer:
-                # Matching DB Object with JobList from Server
-                if request["taskID"] == serverJob["id"]:
-                    print (f"Checking for new Server status on Task {request["taskID"]}")
-                    match serverJob["status"]:
-                        case "running": 
-                            newvalue = {'$set': {'serverStatus': self.TranscriptionStatus.ServerStatus.RUNNING.value}}
-                        case "done": 
-                            newvalue = {'$set': {'serverStatus': self.TranscriptionStatus.ServerStatus.DONE.value}}
-                        case "rejected":
-                            newvalue = {'$set': {'serverStatus': self.TranscriptionStatus.ServerStatus.REJECTED.value}}
-                        case _: return
-                    print ("Setting new serverStatus")
-                    self.mongodb_handler.updateItem({'taskID': request["taskID"]}, newvalue)
+            serverStatus = serverStatusByTask.get(request["taskID"])
+            if serverStatus is None:
+                continue
+            newStatus = self.getServerStatusValue(serverStatus)
+            if newStatus is None:
+                print(f"Unknown status '{serverStatus}' on Task {request['taskID']}, skipping")
+                continue
+            if newStatus != request["serverStatus"]:
+                operations.append(({'_id': request['_id']}, {'$set': {'serverStatus': newStatus}}))
+                transitions[f"{ServerStatus(request['serverStatus']).name} -> {ServerStatus(newStatus).name}"] += 1
+        
+        # Write all changes back at once
+        if operations:
+            self.mongodb_handler.updateMany(operations)
+        print(f"Updated serverStatus of {len(operations)} requests: {dict(transitions)}")
+        return dict(transitions)
     
-    def checkForPendingTranscriptDownload (self):
-        """Check on the Recapp server if there are any pending transcript downloads
+    def checkForPendingTranscriptDownload (self, parallelism: int = None):
+        """Check on the Recapp server if there are any pending transcript downloads and download them concurrently
+
+        Args:
+            parallelism (int, optional): Maximum of concurrent downloads. Defaults to the connection limit of the client.
+
+        Returns:
+            dict: Number of downloads per DownloadStatus
         """
         query = {
             "serverStatus": self.TranscriptionStatus.ServerStatus.DONE.value,
             "downloadStatus": self.TranscriptionStatus.DownloadStatus.NOT_STARTED.value
             }
-        allPendingDownloads = self.mongodb_handler.searchByQuery(query)
-        for pendingDownloadItem in allPendingDownloads:
-            self.getTranscriptFromTask("jobs", pendingDownloadItem["taskID"])
-            time.sleep(1)
+        allPendingDownloads = list(self.mongodb_handler.searchByQuery(query))
+        return self.runAsync(self.downloadTranscripts("jobs", [item["taskID"] for item in allPendingDownloads], parallelism or self.client.maxConnections))
+    
+    async def downloadTranscripts(self, apiEndpoint: str, taskIDs: list, parallelism: int):
+        """Download the transcripts of all given tasks concurrently and save them with a single bulk write
+
+        Args:
+            apiEndpoint (str): Endpoint for API
+            taskIDs (list): Task IDs on Server
+            parallelism (int): Maximum of concurrent downloads
+
+        Returns:
+            dict: Number of downloads per DownloadStatus
+        """
+        semaphore = asyncio.Semaphore(parallelism)
+        
+        async def download(taskID):
+            async with semaphore:
+                status, res = await self.client.getTranscript(apiEndpoint, taskID)
+            return taskID, status, res
+        
+        print(f"Downloading {len(taskIDs)} transcripts with {parallelism} concurrent downloads")
+        operations = []
+        results = Counter()
+        for taskID, status, res in await asyncio.gather(*(download(taskID) for taskID in taskIDs)):
+            if not self.isSuccessHTTPCode(status):
+                # Leave the download pending to retry it on the next check
+                results[self.TranscriptionStatus.DownloadStatus.NOT_STARTED.name] += 1
+                continue
+            newvalues = self.getTranscriptUpdate(res)
+            results[self.TranscriptionStatus.DownloadStatus(newvalues['$set']['downloadStatus']).name] += 1
+            operations.append(({'taskID': taskID}, newvalues))
+        if operations:
+            self.mongodb_handler.updateMany(operations)
+        print(f"Finished downloading transcripts: {dict(results)}")
+        return dict(results)
     
-    def sendCurlCommand(self, command):
-        """Send a curl command
+    def getTranscriptUpdate(self, res: str):
+        """Parse a downloaded transcript once and prepare the update storing it as document together with the merged text
 
         Args:
-            command (str): Command to be sent.
+            res (str): Response body with the transcript
 
         Returns:
-            str: Result from the HTTP-Query or None
+            dict: Update for the request in MongoDB
         """
         try:
-            # Run the curl command and capture the output
-            result = subprocess.run(command, capture_output=True, text=True, check=True)
-            http_code = result.stdout[-3:]
-            print(f"HTTP-Response Code: {http_code}")
-            # If the request is successful, return the response body
-            if self.isSuccessHTTPCode(http_code):
-                return result.stdout
-            else:
-                return None
-        except subprocess.CalledProcessError as e:
-            # If there's an error, return the error message
-            print(f"Error: {e.stderr}")
-            return self.CONST_ERROR_HTTP_RESULT
-
-        except Exception as e:
-            # Handle any other exceptions
-            print(f"An unexpected error occurred: {str(e)}")
-            return self.CONST_ERROR_HTTP_RESULT
+            rawData = json.loads(res)
+            return {
+                '$set': {
+                    'rawTranscriptData': rawData,
+                    'text': self.mergeRecappTranscript(rawData),
+                    'downloadStatus': self.TranscriptionStatus.DownloadStatus.COMPLETED.value
+                }
+            }
+        except (ValueError, KeyError, IndexError, TypeError) as e:
+            print(f"Error while parsing transcript: {e}")
+            return {'$set': {'downloadStatus': self.TranscriptionStatus.DownloadStatus.FAILED.value}}
+    
+    def submitTranscriptionTasks(self, files: list, apiEndpoint: str, targetInFlight: int = CONST_TARGET_IN_FLIGHT, pollInterval: float = CONST_POLL_INTERVAL):
+        """Submit all files to Recapp, keeping a number of jobs in flight instead of waiting a fixed time between them.
+        Files already delivered according to the request collection are skipped, so a restarted run resumes where it stopped.
+
+        Args:
+            files (list): Paths to audio files
+            apiEndpoint (str): API-Endpoint
+            targetInFlight (int, optional): How many jobs are kept on the server at once. Defaults to CONST_TARGET_IN_FLIGHT.
+            pollInterval (float, optional): Seconds between checks of the server queue. Defaults to CONST_POLL_INTERVAL.
+        """
+        self.runAsync(self.scheduleTranscriptionTasks(files, apiEndpoint, targetInFlight, pollInterval))
+
+    async def scheduleTranscriptionTasks(self, files: list, apiEndpoint: str, targetInFlight: int, pollInterval: float):
+        """Submit the next file as soon as a job on the server finishes. 
+        The number of jobs in flight is halved on 429/5xx responses or a rising queue of other jobs on the server and grows back by one per poll.
+        MongoDB is blocking, so every access runs in the default executor instead of on the event loop.
+
+        Args:
+            files (list): Paths to audio files
+            apiEndpoint (str): API-Endpoint
+            targetInFlight (int): Maximum of jobs kept on the server at once
+            pollInterval (float): Seconds between checks of the server queue
+        """
+        ServerStatus = self.TranscriptionStatus.ServerStatus
+        loop = asyncio.get_running_loop()
+        # Restore the state of a previous run from the request collection
+        delivered, failedFiles = await loop.run_in_executor(None, self.getSubmissionState)
+        inFlight = {item["taskID"]: item["serverStatus"] for item in delivered.values()
+                    if item["serverStatus"] in (ServerStatus.PENDING.value, ServerStatus.RUNNING.value)}
+        pending = deque(file for file in files if os.path.basename(file) not in delivered)
+        print(f"Submitting {len(pending)} files, {len(delivered)} already delivered, {len(inFlight)} jobs in flight")
         
+        window = targetInFlight
+        lastQueueDepth = None
+        backoff = 0
+        while pending or inFlight:
+            status, res = await self.client.getAllJobs(apiEndpoint)
+            if self.isSuccessHTTPCode(status):
+                serverJobs = json.loads(res)
+                jobStatus = {job["id"]: job["status"] for job in serverJobs}
+                # Update finished and started jobs, finished jobs free their slot
+                operations = []
+                for taskID, oldStatus in list(inFlight.items()):
+                    if taskID in jobStatus:
+                        newStatus = self.getServerStatusValue(jobStatus[taskID])
+                    else:
+                        newStatus = ServerStatus.DELETED.value
+                    if newStatus is None or newStatus == oldStatus:
+                        continue
+                    operations.append(({'taskID': taskID}, {'$set': {'serverStatus': newStatus}}))
+                    if newStatus in (ServerStatus.PENDING.value, ServerStatus.RUNNING.value):
+                        inFlight[taskID] = newStatus
+                    else:
+                        del inFlight[taskID]
+                if operations:
+                    await loop.run_in_executor(None, self.mongodb_handler.updateMany, operations)
+                # Back off if the queue of other clients keeps growing, the own queued jobs would throttle every submission
+                queueDepth = sum(1 for job in serverJobs if job["status"] == "queued" and job["id"] not in inFlight)
+                if lastQueueDepth is not None and queueDepth > lastQueueDepth:
+                    window = max(1, window // 2)
+                elif window < targetInFlight:
+                    window += 1
+                lastQueueDepth = queueDepth
+            else:
+                window = max(1, window // 2)
+            
+            while pending and len(inFlight) < window:
+                file = pending.popleft()
+                print(f"Sending Request for dialog file: {file} ({len(inFlight) + 1}/{window} in flight)")
+                status, res = await self.client.sendTranscriptionTask(file, apiEndpoint, self.model)
+                taskID = await loop.run_in_executor(None, self.saveTranscriptionTask, file, status, res, failedFiles)
+                if taskID is not None:
+                    inFlight[taskID] = ServerStatus.PENDING.value
+                    backoff = 0
+                elif status is None or status in self.client.CONST_RETRY_STATUS:
+                    # Server is overloaded, try this file again later
+                    pending.appendleft(file)
+                    window = max(1, window // 2)
+                    backoff = min(max(backoff * 2, pollInterval), self.CONST_MAX_BACKOFF)
+                    break
+            await asyncio.sleep(pollInterval + backoff)
+        print("All files submitted and processed by the server")
+
+    def transcribeItems(self, model, device, files: list, apiEndpoint: str = "jobs", targetInFlight: int = CONST_TARGET_IN_FLIGHT, pollInterval: float = CONST_POLL_INTERVAL):
+        """Submit the files, wait until the server has processed them and download the transcripts.
+        Recapp works on the whole batch at once, so the time is split evenly over the files.
+
+        Args:
+            model (Any): Unused, the model is set in the config
+            device (Any): Unused, Recapp runs on its server
+            files (list): Paths to audio files
+            apiEndpoint (str, optional): API-Endpoint. Defaults to "jobs".
+            targetInFlight (int, optional): How many jobs are kept on the server at once. Defaults to CONST_TARGET_IN_FLIGHT.
+            pollInterval (float, optional): Seconds between checks of the server queue. Defaults to CONST_POLL_INTERVAL.
+
+        Yields:
+            Any: Path to the audio file
+            bool: Transcript downloaded
+            float: Seconds spent on the file
+        """
+        startTime = time.perf_counter()
+        self.submitTranscriptionTasks(files, apiEndpoint, targetInFlight, pollInterval)
+        self.checkForUpdatesOnServer()
+        self.checkForPendingTranscriptDownload()
+        query = {"downloadStatus": self.TranscriptionStatus.DownloadStatus.COMPLETED.value}
+        downloaded = {item["fileName"] for item in self.mongodb_handler.searchByQuery(query)}
+        secondsPerFile = (time.perf_counter() - startTime) / max(len(files), 1)
+        for file in files:
+            yield file, os.path.basename(file) in downloaded, secondsPerFile
+
+    def getSubmissionState(self):
+        """Read the delivered and failed requests of earlier runs from the request collection
+
+        Returns:
+            dict: Delivered requests by filename
+            set: Filenames with a failed request
+        """
+        SentStatus = self.TranscriptionStatus.SentStatus
+        delivered = {item["fileName"]: item for item in self.mongodb_handler.searchByQuery({"sentStatus": SentStatus.DELIVERED.value})}
+        failedFiles = {item["fileName"] for item in self.mongodb_handler.searchByQuery({"sentStatus": SentStatus.FAILED.value})}
+        return delivered, failedFiles
+
+    def saveTranscriptionTask(self, pathToAudioFile: str, status: int, res: str, failedFiles: set):
+        """Save the result of a submission in MongoDB, updating the request of an earlier failed attempt
+
+        Args:
+            pathToAudioFile (str): Path to audio file
+            status (int): HTTP-Response Code
+            res (str): Response body
+            failedFiles (set): Filenames with a failed request in the collection
+
+        Returns:
+            str: Task ID on the server or None, if the submission failed
+        """
+        fileName = os.path.basename(pathToAudioFile)
+        convoID, ambient, volume = self.getProcessedFileInfo(pathToAudioFile)
+        taskID = self.getRecappRequestID(res) if self.isSuccessHTTPCode(status) else None
+        newItem = self.createNewRecappRequestBody(taskID or self.CONST_ERROR_HTTP_RESULT, fileName, convoID, ambient, volume)
+        if fileName in failedFiles:
+            self.mongodb_handler.updateItem({'fileName': fileName, 'sentStatus': self.TranscriptionStatus.SentStatus.FAILED.value}, {'$set': newItem})
+        else:
+            self.mongodb_handler.addNewItem(newItem)
+        if taskID is None:
+            failedFiles.add(fileName)
+        return taskID
+
+    def getServerStatusValue(self, status: str):
+        """Map a job status of the Recapp server to the ServerStatus stored in MongoDB
+
+        Args:
+            status (str): Status on the server
+
+        Returns:
+            int: Value of ServerStatus or None, if the status is unknown
+        """
+        match status:
+            case "queued": return self.TranscriptionStatus.ServerStatus.PENDING.value
+            case "running": return self.TranscriptionStatus.ServerStatus.RUNNING.value
+            case "done": return self.TranscriptionStatus.ServerStatus.DONE.value
+            case "rejected": return self.TranscriptionStatus.ServerStatus.REJECTED.value
+            case _: return None
+
     def sendTranscripitionTask(self, pathToAudioFile: str, apiEndpoint: str):
         """Send Transcription Task to Recapp and save request in MongoDB for tracking
 
@@ -149,27 +395,12 @@ class TTSRecapp:
         Returns:
             Any: HTTP-Response
         """
-        # Construct the curl command
-        curl_command = [
-            "curl", 
-            "-X", "POST",  # GET or POST
-            f"{self.api}/{apiEndpoint}",  # URL
-            "-H", "accept: */*",
-            "-H", f"Authorization: Bearer {self.token}",  # Headers
-            "-H", "Content-Type: multipart/form-data",  # Headers
-            "-F", f"data_file=@{pathToAudioFile};type=audio/mpeg",
-            "-F", f"language={self.model}",
-            "-F", "additional_vocab=[]",
-            "-F", "priority=",
-            "-w", "%{http_code}"
-        ]
-        res = self.sendCurlCommand(curl_command)
+        status, res = self.runAsync(self.client.sendTranscriptionTask(pathToAudioFile, apiEndpoint, self.model))
         
         # Extract Conversation ID to add to DB
         convoID, ambient, volume = self.getProcessedFileInfo(pathToAudioFile)
-        http_code = res[-3:]
-        if (self.isSuccessHTTPCode(http_code)):
-            reqID = self.getRecappRequestID(res[:-3])
+        if (self.isSuccessHTTPCode(status)):
+            reqID = self.getRecappRequestID(res)
         else:
             reqID = self.CONST_ERROR_HTTP_RESULT
         newItem = self.createNewRecappRequestBody(reqID, os.path.basename(pathToAudioFile), convoID, ambient, volume)
@@ -186,18 +417,9 @@ class TTSRecapp:
         Returns:
             Any: HTTP-Response
         """
-        # Construct the curl command
-        curl_command = [
-            "curl", 
-            "-X", "GET", 
-            f"{self.api}/{apiEndpoint}/{taskID}",  # URL
-            "-H", "accept: application/json",
-            "-H", f"Authorization: Bearer {self.token}",  # Headers
-            "-w", "%{http_code}"
-        ]
-        res = self.sendCurlCommand(curl_command)
-        if not (res == self.CONST_ERROR_HTTP_RESULT or res == None):
-            data = json.loads(res[:-3])
+        status, res = self.runAsync(self.client.getJob(apiEndpoint, taskID))
+        if self.isSuccessHTTPCode(status):
+            data = json.loads(res)
             match data["status"]:
                 case "queued": newvalue = {'$set': {'serverStatus': self.TranscriptionStatus.ServerStatus.PENDING.value}}
                 case "running": newvalue = {'$set': {'serverStatus': self.TranscriptionStatus.ServerStatus.RUNNING.value}}
@@ -213,19 +435,12 @@ class TTSRecapp:
             apiEndpoint (str): API-Endpoint
 
         Returns:
-            Any: List of all requests on the server
+            Any: List of all requests on the server or None
         """
-        # Construct the curl command
-        curl_command = [
-            "curl", 
-            "-X", "GET", 
-            f"{self.api}/{apiEndpoint}",  # URL
-            "-H", "accept: application/json",
-            "-H", f"Authorization: Bearer {self.token}",  # Headers
-            "-w", "%{http_code}"
-        ]
-        res = self.sendCurlCommand(curl_command)
-        return res[:-3]
+        status, res = self.runAsync(self.client.getAllJobs(apiEndpoint))
+        if self.isSuccessHTTPCode(status):
+            return res
+        return None
           
     def getTranscriptFromTask(self, apiEndpoint: str, taskID: str):
         """Update the Request-Object in MongoDB with the Transcript if its done.
@@ -237,24 +452,10 @@ class TTSRecapp:
         Returns:
             Any: HTTP-Response
         """
-        # Construct the curl command
-        curl_command = [
-            "curl", 
-            "-X", "GET", 
-            f"{self.api}/{apiEndpoint}/{taskID}/transcript",  # URL
-            "-H", "accept: application/json",
-            "-H", f"Authorization: Bearer {self.token}",  # Headers
-            "-w", "%{http_code}"
-        ]
-        res = self.sendCurlCommand(curl_command)
-        if not (res == self.CONST_ERROR_HTTP_RESULT or res == None):
+        status, res = self.runAsync(self.client.getTranscript(apiEndpoint, taskID))
+        if self.isSuccessHTTPCode(status):
             # Prepare item in DB to be updated
-            newvalues = {
-                '$set': {
-                    'rawTranscriptData': res[:-3],
-                    'downloadStatus': self.TranscriptionStatus.DownloadStatus.COMPLETED.value
-                }
-            }
+            newvalues = self.getTranscriptUpdate(res)
             self.mongodb_handler.updateItem({'taskID': taskID}, newvalues)
         return res
 
@@ -323,6 +524,22 @@ class TTSRecapp:
             str: Source Directory Path
         """
         return self.recapp_config['source_dir']
+
+    def getSourceDirectory(self):
+        """Return Source Directory Path
+
+        Returns:
+            str: Source Directory Path
+        """
+        return self.getSourceFolderPath()
+
+    def getSourceFiles(self):
+        """Return all WAV-Files of the source directory, sorted alphabetically
+
+        Returns:
+            list: Paths to the audio files
+        """
+        return [file for file in super().getSourceFiles() if file.suffix.lower() == ".wav"]
     
     def isSuccessHTTPCode(self, HTTP_code):
         """Check if HTTP-Code is Success
@@ -333,7 +550,7 @@ class TTSRecapp:
         Returns:
             Bool: Is Sucess Code
         """
-        return 200 <= int(HTTP_code) < 300
+        return HTTP_code is not None and 200 <= int(HTTP_code) < 300
     
     def mergeRecappTranscript(self, rawData: list):
         """Merge all single word transcriptions into a whole text (ignoring the speaker)
@@ -355,15 +572,20 @@ class TTSRecapp:
         return mergedText[:-1]
     
     def transferTranscriptsFilesToMongoDB (self):
-        """Transfer all requests from the requests collection to the transcription collection
+        """Transfer all downloaded transcripts from the requests collection to the transcription collection
         """
-        allRequests = list(self.mongodb_handler.getAllItems())
+        query = {"downloadStatus": self.TranscriptionStatus.DownloadStatus.COMPLETED.value}
+        newObjects = [self.createNewRecappMongoDBObject(req) for req in self.mongodb_handler.iterQuery(query)]
         # Pointing MongoDB Handler to new DB and Collection to transfer Transcripts
         self.mongodb_handler.setDB(self.recapp_config['transcript_db'])
         self.mongodb_handler.setCollection(self.recapp_config['transcript_collection'])
-        for req in allRequests:
-            newObject = self.createNewRecappMongoDBObject(req)
-            self.mongodb_handler.addNewItem(newObject)
+        self.mongodb_handler.ensureIndexes("transcripts")
+        # Upserting on the transcript key keeps reruns free of duplicates
+        result = self.mongodb_handler.upsertItems(newObjects, MongoDBHandler.CONST_TRANSCRIPT_KEY)
+        print(f"Transferred transcripts to MongoDB: {result['upserted']} new, {result['updated']} updated, {result['failed']} failed")
+        # Pointing MongoDB Handler back to the requests
+        self.mongodb_handler.setDB(self.recapp_config['recapp_db_name'])
+        self.mongodb_handler.setCollection(self.recapp_config['req_collection'])
 
     def createNewRecappMongoDBObject (self, requestbody):
         """Converting HTML-Response to MongoDB Object
@@ -374,7 +596,10 @@ class TTSRecapp:
         Returns:
             dict: Object for MongoDB
         """
-        rawData = json.loads(requestbody["rawTranscriptData"])
+        rawData = requestbody["rawTranscriptData"]
+        # Requests downloaded before the transcripts were stored as documents hold the raw response body
+        if isinstance(rawData, str):
+            rawData = json.loads(rawData)
         transcript_template = {
             "technology": "recapp", #which technology has been used
             "model": self.model, # which model has been used
@@ -382,7 +607,7 @@ class TTSRecapp:
             "convoID": requestbody["convoID"], # Holds the ID of the conversation, which is processed
             "ambientVariant": requestbody["ambientVariant"], # What ambient version it this layered with
             "processedVolume": requestbody["processedVolume"], # what adjusted ambient volume is contained
-            "text": self.mergeRecappTranscript(rawData),
-            "rawTranscriptData": requestbody["rawTranscriptData"] # Raw Data for Transcript from Response Body
+            "text": requestbody.get("text") or self.mergeRecappTranscript(rawData),
+            "rawTranscriptData": rawData # Raw Data for Transcript from Response Body
         }
         return transcript_template
\ No newline at end of file
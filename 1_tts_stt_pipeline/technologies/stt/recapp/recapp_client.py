@@ -0,0 +1,187 @@
+import asyncio
+import contextlib
+import os
+import aiohttp
+
+class RecappClient:
+    CONST_RETRY_STATUS = (429, 500, 502, 503, 504) # HTTP-Codes worth retrying
+    CONST_IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE") # Methods that may be repeated after any failure
+    CONST_REJECTED_STATUS = (429,) # HTTP-Codes meaning the server did not process the request, safe to retry for every method
+    CONST_KEEPALIVE_TIMEOUT = 60 # Seconds an idle connection is kept open
+
+    def __init__(self, api: str, token: str, maxConnections: int = 4, maxRetries: int = 3, backoff: float = 2.0, timeout: float = 600):
+        """Initialize an asynchronous client for the Recapp API with a pool of keep-alive connections
+
+        Args:
+            api (str): URL to Recapp API
+            token (str): Access Token for Recapp API
+            maxConnections (int, optional): Maximum of concurrent requests and open connections. Defaults to 4.
+            maxRetries (int, optional): How often a failed request is retried. Defaults to 3.
+            backoff (float, optional): Base delay in seconds, doubled on every retry. Defaults to 2.0.
+            timeout (float, optional): Total timeout of a request in seconds. Defaults to 600.
+        """
+        self.api = api.rstrip("/")
+        self.token = token
+        self.maxConnections = maxConnections
+        self.maxRetries = maxRetries
+        self.backoff = backoff
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.session = None
+        self.semaphore = None
+
+    async def __aenter__(self):
+        await self.getSession()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def getSession(self):
+        """Return the shared session, creating it on the running event loop if needed
+
+        Returns:
+            aiohttp.ClientSession: Session holding the connection pool
+        """
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.maxConnections, keepalive_timeout=self.CONST_KEEPALIVE_TIMEOUT)
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=self.timeout,
+                headers={"Authorization": f"Bearer {self.token}"}
+            )
+            self.semaphore = asyncio.Semaphore(self.maxConnections)
+        return self.session
+
+    async def close(self):
+        """Close the session and all pooled connections
+        """
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+
+    async def request(self, method: str, path: str, accept: str = "application/json", fields: dict = None, uploadFile: str = None):
+        """Send a request, retrying with exponential backoff on connection errors, 429 and 5xx responses.
+        Non-idempotent requests (e.g. the upload POST) are only retried if they never reached the server:
+        a 5xx or a dropped connection after the upload may mean the job was created, a retry would create it twice.
+
+        Args:
+            method (str): HTTP-Method
+            path (str): Path of the endpoint, relative to the API URL
+            accept (str, optional): Accept-Header. Defaults to "application/json".
+            fields (dict, optional): Form fields to send as multipart/form-data. Defaults to None.
+            uploadFile (str, optional): Path to an audio file streamed as "data_file" from disk. Defaults to None.
+
+        Returns:
+            int: HTTP-Response Code or None, if no response has been received
+            str: Response body or None
+        """
+        session = await self.getSession()
+        url = f"{self.api}/{path}"
+        status = body = None
+        idempotent = method.upper() in self.CONST_IDEMPOTENT_METHODS
+        for attempt in range(self.maxRetries + 1):
+            retryAfter = None
+            retryable = True
+            try:
+                async with self.semaphore:
+                    # A new form is needed on every attempt, since the file is consumed while streaming
+                    with contextlib.ExitStack() as stack:
+                        form = None
+                        if fields is not None or uploadFile is not None:
+                            form = aiohttp.FormData(fields or {})
+                        if uploadFile is not None:
+                            audioFile = stack.enter_context(open(uploadFile, "rb"))
+                            form.add_field("data_file", audioFile, filename=os.path.basename(uploadFile), content_type="audio/mpeg")
+                        async with session.request(method, url, headers={"accept": accept}, data=form) as response:
+                            status = response.status
+                            body = await response.text()
+                            retryAfter = response.headers.get("Retry-After")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                print(f"Error while requesting {url}: {e}")
+                status = body = None
+                # Only a failed connect guarantees that nothing was sent
+                retryable = idempotent or isinstance(e, aiohttp.ClientConnectorError)
+
+            if status is not None and status not in self.CONST_RETRY_STATUS:
+                break
+            if status is not None and not idempotent and status not in self.CONST_REJECTED_STATUS:
+                retryable = False
+            if not retryable:
+                print(f"Not retrying {method} {url}, the server may already have processed it")
+                break
+            if attempt < self.maxRetries:
+                delay = self.getRetryDelay(attempt, retryAfter)
+                print(f"HTTP-Response Code: {status}, retrying {url} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+        print(f"HTTP-Response Code: {status}")
+        return status, body
+
+    def getRetryDelay(self, attempt: int, retryAfter: str = None):
+        """Return how long to wait before the next attempt, preferring the Retry-After header of the server
+
+        Args:
+            attempt (int): Number of the failed attempt, starting at 0
+            retryAfter (str, optional): Value of the Retry-After header. Defaults to None.
+
+        Returns:
+            float: Delay in seconds
+        """
+        if retryAfter is not None and retryAfter.isdigit():
+            return float(retryAfter)
+        return self.backoff * (2 ** attempt)
+
+    async def sendTranscriptionTask(self, pathToAudioFile: str, apiEndpoint: str, model: str):
+        """Upload an audio file to be transcribed
+
+        Args:
+            pathToAudioFile (str): Path to audio file
+            apiEndpoint (str): API-Endpoint
+            model (str): Which model is to be used from Recapp
+
+        Returns:
+            int: HTTP-Response Code
+            str: Response body
+        """
+        fields = {
+            "language": model,
+            "additional_vocab": "[]",
+            "priority": ""
+        }
+        return await self.request("POST", apiEndpoint, accept="*/*", fields=fields, uploadFile=str(pathToAudioFile))
+
+    async def getJob(self, apiEndpoint: str, taskID: str):
+        """Get the status of a specific job
+
+        Args:
+            apiEndpoint (str): API-Endpoint
+            taskID (str): Task ID
+
+        Returns:
+            int: HTTP-Response Code
+            str: Response body
+        """
+        return await self.request("GET", f"{apiEndpoint}/{taskID}")
+
+    async def getAllJobs(self, apiEndpoint: str):
+        """Get a list of all jobs on the server
+
+        Args:
+            apiEndpoint (str): API-Endpoint
+
+        Returns:
+            int: HTTP-Response Code
+            str: Response body
+        """
+        return await self.request("GET", apiEndpoint)
+
+    async def getTranscript(self, apiEndpoint: str, taskID: str):
+        """Get the transcript of a finished job
+
+        Args:
+            apiEndpoint (str): API-Endpoint
+            taskID (str): Task ID
+
+        Returns:
+            int: HTTP-Response Code
+            str: Response body
+        """
+        return await self.request("GET", f"{apiEndpoint}/{taskID}/transcript")
@@ -0,0 +1,123 @@
+import argparse
+import random
+import time
+import uuid
+from datetime import datetime, timezone
+from aiohttp import web
+
+class RecappStubServer:
+    def __init__(self, processingTime: float = 5.0, failureRate: float = 0.0):
+        """Local stand-in for the /jobs endpoints of the Recapp API to test the client without the real server
+
+        Args:
+            processingTime (float, optional): Seconds until a job is done. Defaults to 5.0.
+            failureRate (float, optional): Share of requests answered with 503 to test retries. Defaults to 0.0.
+        """
+        self.processingTime = processingTime
+        self.failureRate = failureRate
+        self.jobs = {}
+
+    def createApp(self):
+        """Create the web application with all routes
+
+        Returns:
+            web.Application: Application to be run
+        """
+        app = web.Application(middlewares=[self.checkRequest])
+        app.add_routes([
+            web.post("/jobs", self.createJob),
+            web.get("/jobs", self.listJobs),
+            web.get("/jobs/{id}", self.getJob),
+            web.get("/jobs/{id}/transcript", self.getTranscript)
+        ])
+        return app
+
+    @web.middleware
+    async def checkRequest(self, request, handler):
+        """Reject requests without a token and simulate an overloaded server
+        """
+        if not request.headers.get("Authorization", "").startswith("Bearer "):
+            raise web.HTTPUnauthorized()
+        if random.random() < self.failureRate:
+            raise web.HTTPServiceUnavailable(headers={"Retry-After": "1"})
+        return await handler(request)
+
+    def getStatus(self, job: dict):
+        """Derive the status of a job from its age
+
+        Args:
+            job (dict): Job on the server
+
+        Returns:
+            str: Status of the job
+        """
+        age = time.time() - job["created"]
+        if age < self.processingTime / 2:
+            return "queued"
+        if age < self.processingTime:
+            return "running"
+        return "done"
+
+    def getJobInfo(self, job: dict):
+        """Return the job as listed by the Recapp server
+
+        Args:
+            job (dict): Job on the server
+
+        Returns:
+            dict: Job with ID, status and creation time
+        """
+        return {
+            "id": job["id"],
+            "status": self.getStatus(job),
+            "created_at": datetime.fromtimestamp(job["created"], timezone.utc).isoformat(),
+            "filename": job["fileName"]
+        }
+
+    def getJobByRequest(self, request):
+        """Return the job addressed in the URL or answer with 404
+        """
+        job = self.jobs.get(request.match_info["id"])
+        if job is None:
+            raise web.HTTPNotFound()
+        return job
+
+    async def createJob(self, request):
+        """POST /jobs: Accept an uploaded audio file and create a job for it
+        """
+        form = await request.post()
+        dataFile = form.get("data_file")
+        if dataFile is None or not hasattr(dataFile, "file"):
+            raise web.HTTPBadRequest(text="data_file is missing")
+        dataFile.file.read()
+        jobID = str(uuid.uuid4())
+        self.jobs[jobID] = {"id": jobID, "created": time.time(), "fileName": dataFile.filename}
+        return web.json_response({"id": jobID}, status=201)
+
+    async def listJobs(self, request):
+        """GET /jobs: List all jobs
+        """
+        return web.json_response([self.getJobInfo(job) for job in self.jobs.values()])
+
+    async def getJob(self, request):
+        """GET /jobs/{id}: Return a single job
+        """
+        return web.json_response(self.getJobInfo(self.getJobByRequest(request)))
+
+    async def getTranscript(self, request):
+        """GET /jobs/{id}/transcript: Return a word-level transcript in the Recapp layout
+        """
+        job = self.getJobByRequest(request)
+        if self.getStatus(job) != "done":
+            raise web.HTTPConflict(text="Job not done yet")
+        words = ["Transkript", "von", job["fileName"]]
+        return web.json_response({"results": [{"alternatives": [{"content": word}]} for word in words]})
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local stub of the Recapp /jobs API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--processing-time", type=float, default=5.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    web.run_app(RecappStubServer(args.processing_time, args.failure_rate).createApp(), host=args.host, port=args.port)
@@ -1,91 +1,151 @@
-
 from utils.setup_helper import SetupHelper
+from technologies.stt.stt_engine import STTEngine
 import os
+import threading
 import torch
-from pathlib import Path
-import json
+from torch.nn.utils.rnn import pad_sequence
 
 from speechbrain.inference.separation import SepformerSeparation as Separator
 from speechbrain.inference.ASR import WhisperASR
 
-class TTSSpeechBrain:
+# Loaded SpeechBrain models of this process, kept resident across runs
+_modelRegistry = {}
+_modelRegistryLock = threading.Lock()
+
+def getSpeechBrainModel(modelClass, source: str, savedir: str, device, hparamsFile: str = "hyperparams.yaml"):
+    """Return a SpeechBrain model, loading it only on the first request per source and device
+
+    Args:
+        modelClass (Any): SpeechBrain class of the model, e.g. WhisperASR
+        source (str): Hugging Face source of the model
+        savedir (str): Folder the pretrained files are stored in
+        device (Any): CUDA Device or CPU
+        hparamsFile (str, optional): Hyperparameter file of the model. Defaults to "hyperparams.yaml".
+
+    Returns:
+        Any: Loaded model
+    """
+    key = (source, hparamsFile, str(device))
+    with _modelRegistryLock:
+        if key not in _modelRegistry:
+            print(f"Loading SpeechBrain model {source} ({hparamsFile}) on {device}")
+            _modelRegistry[key] = modelClass.from_hparams(source=source, savedir=savedir, hparams_file=hparamsFile, run_opts={"device": str(device)})
+        return _modelRegistry[key]
+
+class TTSSpeechBrain(STTEngine):
+    CONST_TECHNOLOGY = "speechbrain"
+    CONST_BATCH_SIZE = 4 # How many files are transcribed together
+    CONST_CHUNK_SECONDS = 30 # Whisper pads or trims its input to 30s, longer audio is cut into chunks of this length
+    CONST_CHUNK_BATCH_SIZE = 8 # How many chunks are padded into one batch
+
     def __init__(self):
         """Initialize TTS SpeechBrain by loading the config file
         """
         speechbrain_setup = SetupHelper("tts_speechbrain", os.getcwd())
         self.speechbrain_config = speechbrain_setup.getConfigValues()
         
-    def transcribeFiles (self, model, device, language):
+    def transcribeFiles (self, model, device, language, batchSize: int = CONST_BATCH_SIZE, threads: int = None):
         """Transcribe all files in the given source folder
+
+        Args:
+            model (Any): Name of the model
+            device (Any): CUDA Device or CPU
+            language (Any): Unused, the models are trained for German
+            batchSize (int, optional): How many files are transcribed together. Defaults to CONST_BATCH_SIZE.
+            threads (int, optional): CPU threads used by torch. Defaults to the torch default.
         """
-        # Load Model
-        match model:
-            case"noisy-whisper-rescuespeech":
-                model["enh_model"] = Separator.from_hparams(
-                    source="speechbrain/noisy-whisper-resucespeech", 
-                    savedir='pretrained_models/noisy-whisper-rescuespeech',
-                    hparams_file="enhance.yaml"
-                )
-                model["asr_model"] = WhisperASR.from_hparams(
-                    source="speechbrain/noisy-whisper-resucespeech", 
-                    savedir="pretrained_models/noisy-whisper-rescuespeech",
-                    hparams_file="asr.yaml"
-                )
-            case "whisper_rescuespeech":
-                model["asr_model"] = WhisperASR.from_hparams(
-                    source="speechbrain/rescuespeech_whisper", 
-                    savedir="pretrained_models/rescuespeech_whisper"
-                )
-            case _:
-                print("no Matching Model-Handling found.")
-                return
-        modelOutput = os.path.join(self.getOutputDirectory(), model)
-        
-        # Sort Files alphabetically
-        src = Path(self.getSourceDirectory())
-        src_sorted = sorted(src.iterdir(), key=lambda x: x.name)
-        
-        # Setup Output Folder
-        if not Path(modelOutput).exists():
-            print(f"Model-Folder not found. Creating Folder '{model}' at {self.getOutputDirectory()}.")
-            Path(modelOutput).mkdir(parents=True, exist_ok=True)
-            
-        for file in src_sorted:
-            print (f"Transcribing file: {file}")
-            # Prepare Outputfile
-            fileName = file.stem
-            saveFile = "speechbrain_" + model + "_" + fileName + ".json"
-            savePath = os.path.join(modelOutput, saveFile)
-            # Start Transcription
-            transcription = self.transcribe(model, file, device)
-            jsonResult = json.dumps(transcription, indent=4)
-            print(f"Saving transcript to file at {savePath}")
-            with open(savePath, 'w') as f:
-                f.write(jsonResult)
-            f.close()
-                
-    def transcribe (self, model: list, filePath, device):
-        """Transcribe the given audio file
+        for _ in self.transcribeItems(model, device, self.getSourceFiles(), batchSize=batchSize, threads=threads):
+            pass
+
+    def loadModel(self, model, device, threads: int = None):
+        """Return the SpeechBrain Models needed for the given model from the registry
 
         Args:
-            model (list): SpeechBrain Model
-            filePath (Any): Path to Audio File
+            model (Any): Name of the model
             device (Any): CUDA Device or CPU
+            threads (int, optional): CPU threads used by torch. Defaults to the torch default.
 
         Returns:
-            str: Transcribed Text
+            dict: Name of the model with the loaded enhancement and ASR models
         """
+        device = device or "cpu"
+        if threads and not str(device).startswith("cuda"):
+            torch.set_num_threads(threads)
+        loadedModel = {"name": model, "device": device}
         match model:
             case"noisy-whisper-rescuespeech":
-                est_sources = Separator(model["enh_model"]).separate_file(path=filePath)
-                pred_words, _ = WhisperASR(model["asr_model"])(est_sources[:, :, 0], torch.tensor([1.0]))
-                return pred_words
+                loadedModel["enh_model"] = getSpeechBrainModel(Separator, "speechbrain/noisy-whisper-resucespeech",
+                                                               "pretrained_models/noisy-whisper-rescuespeech", device, "enhance.yaml")
+                loadedModel["asr_model"] = getSpeechBrainModel(WhisperASR, "speechbrain/noisy-whisper-resucespeech",
+                                                               "pretrained_models/noisy-whisper-rescuespeech", device, "asr.yaml")
             case "whisper_rescuespeech":
-                transcript = WhisperASR(model["asr_model"]).transcribe_file(filePath)
-                return transcript
+                loadedModel["asr_model"] = getSpeechBrainModel(WhisperASR, "speechbrain/rescuespeech_whisper",
+                                                               "pretrained_models/rescuespeech_whisper", device)
             case _:
-                print("no Matching Model-Handling found.")
-                
+                raise ValueError(f"no Matching Model-Handling found for {model}.")
+        return loadedModel
+
+    def transcribeFile(self, loadedModel: dict, file):
+        """Transcribe a single file
+
+        Args:
+            loadedModel (dict): Models returned by loadModel
+            file (Any): Path to Audio File
+
+        Returns:
+            str: Transcribed Text
+        """
+        return self.transcribeBatch(loadedModel, [file])[0]
+
+    def transcribeBatch(self, loadedModel: dict, files: list):
+        """Transcribe several files together.
+        Whisper only sees the first 30s of its input, so every file is cut into chunks of CONST_CHUNK_SECONDS,
+        the chunks of all files are padded into batches and the texts of the chunks are joined per file in order.
+        With an enhancement model every chunk is separated and passed straight to the ASR model, the file is read only once.
+
+        Args:
+            loadedModel (dict): Models returned by loadModel
+            files (list): Paths to Audio Files
+
+        Returns:
+            list: Transcribed Text per file
+        """
+        # Read and resample with the first model of the chain
+        frontModel = loadedModel.get("enh_model", loadedModel["asr_model"])
+        chunkSamples = self.CONST_CHUNK_SECONDS * frontModel.audio_normalizer.sample_rate
+        chunks = []
+        chunkOwners = []
+        for fileIndex, file in enumerate(files):
+            for chunk in torch.split(frontModel.load_audio(str(file)), chunkSamples):
+                chunks.append(chunk)
+                chunkOwners.append(fileIndex)
+
+        texts = [[] for _ in files]
+        for chunkStart in range(0, len(chunks), self.CONST_CHUNK_BATCH_SIZE):
+            wavs, wavLens = self.padWaveforms(chunks[chunkStart:chunkStart + self.CONST_CHUNK_BATCH_SIZE], loadedModel["device"])
+            with torch.no_grad():
+                if "enh_model" in loadedModel:
+                    wavs = loadedModel["enh_model"].separate_batch(wavs)[:, :, 0]
+                predWords, _ = loadedModel["asr_model"].transcribe_batch(wavs, wavLens)
+            for fileIndex, text in zip(chunkOwners[chunkStart:chunkStart + self.CONST_CHUNK_BATCH_SIZE], predWords):
+                texts[fileIndex].append(text.strip())
+        return [" ".join(text for text in fileTexts if text) for fileTexts in texts]
+
+    def padWaveforms(self, waveforms: list, device):
+        """Pad waveforms of different lengths into one batch
+
+        Args:
+            waveforms (list): 1D tensors of the waveforms
+            device (Any): CUDA Device or CPU
+
+        Returns:
+            torch.Tensor: Padded batch (batch, time)
+            torch.Tensor: Length of every waveform relative to the longest
+        """
+        lengths = torch.tensor([len(waveform) for waveform in waveforms], dtype=torch.float)
+        wavs = pad_sequence(waveforms, batch_first=True)
+        return wavs.to(device), (lengths / lengths.max()).to(device)
+
     def getSourceDirectory(self):
         """Return Source Directory Path
 
@@ -0,0 +1,172 @@
+import os
+import time
+from pathlib import Path
+from technologies.stt.transcription_manifest import TranscriptionManifest, writeJSONAtomic
+
+class STTEngine:
+    """Common interface of all STT engines.
+    An engine loads a model once with loadModel and transcribes single files with transcribeFile.
+    File discovery, the output folder and saving the transcripts are shared by all engines.
+    """
+    CONST_TECHNOLOGY = None # Prefix of the transcript files and name in the summary, e.g. "whisper"
+    CONST_IS_LOCAL = True # Runs on this machine (CPU/GPU bound) or on a remote server (network bound)
+
+    def getSourceDirectory(self):
+        """Return Source Directory Path
+
+        Returns:
+            str: Source Directory Path
+        """
+        raise NotImplementedError
+
+    def getOutputDirectory(self):
+        """Return Output Directory Path
+
+        Returns:
+            str: Output Directory Path
+        """
+        raise NotImplementedError
+
+    def getSourceFiles(self):
+        """Return all files of the source directory, sorted alphabetically
+
+        Returns:
+            list: Paths to the audio files
+        """
+        src = Path(self.getSourceDirectory())
+        return sorted((file for file in src.iterdir() if file.is_file()), key=lambda x: x.name)
+
+    def getModelOutputDirectory(self, model: str):
+        """Return the output folder of a model, creating it if needed
+
+        Args:
+            model (str): Name of the model
+
+        Returns:
+            str: Path to the output folder of the model
+        """
+        modelOutput = os.path.join(self.getOutputDirectory(), model)
+        if not Path(modelOutput).exists():
+            print(f"Model-Folder not found. Creating Folder '{model}' at {self.getOutputDirectory()}.")
+            Path(modelOutput).mkdir(parents=True, exist_ok=True)
+        return modelOutput
+
+    def getTranscriptPath(self, model: str, file):
+        """Return the path of the transcript of a file
+
+        Args:
+            model (str): Name of the model
+            file (Any): Path to the audio file
+
+        Returns:
+            str: Path to the JSON-File of the transcript
+        """
+        saveFile = f"{self.CONST_TECHNOLOGY}_{model}_{Path(file).stem}.json"
+        return os.path.join(self.getModelOutputDirectory(model), saveFile)
+
+    def getManifest(self, model: str):
+        """Return the manifest of the transcribed files of a model.
+        It is kept next to the model folders, since everything inside them is read as a transcript.
+
+        Args:
+            model (str): Name of the model
+
+        Returns:
+            TranscriptionManifest: Manifest of the model
+        """
+        Path(self.getOutputDirectory()).mkdir(parents=True, exist_ok=True)
+        return TranscriptionManifest(os.path.join(self.getOutputDirectory(), f"{self.CONST_TECHNOLOGY}_{model}_manifest.json"))
+
+    def saveTranscript(self, savePath: str, transcription):
+        """Save a transcript as JSON-File, written atomically so a partial file is never left behind
+
+        Args:
+            savePath (str): Path to the JSON-File
+            transcription (Any): Transcript of the engine
+        """
+        print(f"Saving transcript to file at {savePath}")
+        writeJSONAtomic(savePath, transcription)
+
+    def loadModel(self, model: str, device, **options):
+        """Load a model to transcribe files with
+
+        Args:
+            model (str): Name of the model
+            device (Any): CUDA Device or CPU
+            **options: Engine specific options, e.g. the language
+
+        Returns:
+            Any: Loaded model, passed to transcribeFile
+        """
+        raise NotImplementedError
+
+    def transcribeFile(self, loadedModel, file):
+        """Transcribe a single file
+
+        Args:
+            loadedModel (Any): Model returned by loadModel
+            file (Any): Path to the audio file
+
+        Returns:
+            Any: Transcript, which can be saved as JSON
+        """
+        raise NotImplementedError
+
+    def transcribeBatch(self, loadedModel, files: list):
+        """Transcribe several files at once. Engines that can batch override this, the default transcribes file by file
+
+        Args:
+            loadedModel (Any): Model returned by loadModel
+            files (list): Paths to the audio files
+
+        Returns:
+            list: Transcripts in the order of the files
+        """
+        return [self.transcribeFile(loadedModel, file) for file in files]
+
+    def transcribeItems(self, model: str, device, files: list, batchSize: int = 1, **options):
+        """Load the model once and transcribe the given files with it, saving every transcript.
+        Files already transcribed according to the manifest are skipped, failed ones are retried.
+
+        Args:
+            model (str): Name of the model
+            device (Any): CUDA Device or CPU
+            files (list): Paths to the audio files
+            batchSize (int, optional): How many files are passed to transcribeBatch at once. Defaults to 1.
+            **options: Engine specific options, passed to loadModel
+
+        Yields:
+            Any: Path to the audio file
+            bool: Transcribed successfully
+            float: Seconds spent on the file
+        """
+        manifest = self.getManifest(model)
+        files = manifest.getPendingFiles(files)
+        if not files:
+            return
+        try:
+            loadedModel = self.loadModel(model, device, **options)
+            for batchStart in range(0, len(files), batchSize):
+                batchFiles = files[batchStart:batchStart + batchSize]
+                startTime = time.perf_counter()
+                try:
+                    for file in batchFiles:
+                        print (f"Transcribing file: {file}")
+                    transcriptions = self.transcribeBatch(loadedModel, batchFiles)
+                    # A batch is processed as a whole, so its time is split evenly over its files
+                    duration = (time.perf_counter() - startTime) / len(batchFiles)
+                    for file, transcription in zip(batchFiles, transcriptions):
+                        savePath = self.getTranscriptPath(model, file)
+                        self.saveTranscript(savePath, transcription)
+                        manifest.markDone(file, savePath, duration)
+                        yield file, True, duration
+                except Exception as e:
+                    duration = (time.perf_counter() - startTime) / len(batchFiles)
+                    print(f"Error while transcribing {', '.join(str(file) for file in batchFiles)}: {e}")
+                    for file in batchFiles:
+                        if not manifest.isDone(file):
+                            manifest.markFailed(file, str(e), duration)
+                            yield file, False, duration
+        finally:
+            # The manifest is only saved every few files, the rest is written at the end of the run or when it is interrupted
+            manifest.flush()
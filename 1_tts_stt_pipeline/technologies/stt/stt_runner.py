@@ -0,0 +1,128 @@
+import time
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from utils.audio_array import AudioArray
+from technologies.stt.stt_engine import STTEngine
+
+class STTRunner:
+    def __init__(self, localWorkers: int = 1):
+        """Schedule (engine, model, file) work items over all engines.
+        Local engines share a lane of localWorkers threads, remote engines get a thread each, so both run at the same time.
+
+        Args:
+            localWorkers (int, optional): How many local engines or models run at once. Defaults to 1, since they compete for CPU and GPU.
+        """
+        self.localWorkers = localWorkers
+        self.workItems = []
+        self.engineSettings = {}
+        self.stats = defaultdict(lambda: {"files": 0, "failed": 0, "audioDuration": 0.0, "busyTime": 0.0})
+        self.lock = threading.Lock()
+
+    def addEngine(self, engine: STTEngine, models: list, device=None, files: list = None, **options):
+        """Add a work item for every model and file of an engine
+
+        Args:
+            engine (STTEngine): Engine to transcribe with
+            models (list): Names of the models
+            device (Any, optional): CUDA Device or CPU. Defaults to None.
+            files (list, optional): Paths to the audio files. Defaults to all files in the source directory of the engine.
+            **options: Engine specific options, passed to loadModel (e.g. language) or transcribeItems
+        """
+        files = engine.getSourceFiles() if files is None else files
+        self.engineSettings[id(engine)] = (device, options)
+        for model in models:
+            self.workItems.extend((engine, model, file) for file in files)
+
+    def getGroups(self):
+        """Group the work items by engine and model, so every model is loaded once
+
+        Returns:
+            list: Tuples of engine, model and files
+        """
+        groups = {}
+        for engine, model, file in self.workItems:
+            groups.setdefault((id(engine), model), (engine, model, []))[2].append(file)
+        return list(groups.values())
+
+    def getAudioDuration(self, file):
+        """Duration of a WAV-File from its header, without reading the audio
+
+        Args:
+            file (Any): Path to the audio file
+
+        Returns:
+            float: Duration in seconds, 0 if the file is no 16bit PCM WAV-File
+        """
+        try:
+            channels, frameRate, _, dataSize = AudioArray.readWavHeader(str(file))
+            return dataSize / (2 * channels * frameRate)
+        except (OSError, ValueError):
+            return 0.0
+
+    def runGroup(self, engine: STTEngine, model: str, files: list):
+        """Run the work items of one engine and model, collecting the statistics. Files skipped by the engine are not counted
+
+        Args:
+            engine (STTEngine): Engine to transcribe with
+            model (str): Name of the model
+            files (list): Paths to the audio files
+        """
+        device, options = self.engineSettings[id(engine)]
+        key = f"{engine.CONST_TECHNOLOGY}/{model}"
+        print(f"Starting {len(files)} work items for {key}")
+        try:
+            for file, success, seconds in engine.transcribeItems(model, device, files, **options):
+                with self.lock:
+                    stats = self.stats[key]
+                    stats["files"] += 1
+                    stats["failed"] += 0 if success else 1
+                    stats["audioDuration"] += self.getAudioDuration(file)
+                    stats["busyTime"] += seconds
+        except Exception as e:
+            print(f"Error while running {key}: {e}")
+
+    def runLocalGroups(self, groups: list):
+        """Run the groups of the local engines, at most localWorkers at once
+
+        Args:
+            groups (list): Tuples of engine, model and files
+        """
+        with ThreadPoolExecutor(max_workers=self.localWorkers) as executor:
+            for future in [executor.submit(self.runGroup, *group) for group in groups]:
+                future.result()
+
+    def run(self):
+        """Run all work items and print a summary per engine
+
+        Returns:
+            dict: Statistics per engine and model
+        """
+        groups = self.getGroups()
+        localGroups = [group for group in groups if group[0].CONST_IS_LOCAL]
+        remoteGroups = [group for group in groups if not group[0].CONST_IS_LOCAL]
+        print(f"Running {len(self.workItems)} work items: {len(localGroups)} local and {len(remoteGroups)} remote engine/model pairs")
+
+        startTime = time.perf_counter()
+        # The network bound engines wait on their servers while the local engines use the CPU
+        with ThreadPoolExecutor(max_workers=len(remoteGroups) + 1) as executor:
+            futures = [executor.submit(self.runGroup, *group) for group in remoteGroups]
+            futures.append(executor.submit(self.runLocalGroups, localGroups))
+            for future in futures:
+                future.result()
+        self.printSummary(time.perf_counter() - startTime)
+        return {key: dict(stats) for key, stats in self.stats.items()}
+
+    def printSummary(self, elapsedTime: float):
+        """Print the throughput of every engine and model
+
+        Args:
+            elapsedTime (float): Wall time of the whole run in seconds
+        """
+        print(f"{'Engine/Model':<40} {'Files':>6} {'Failed':>6} {'Audio [s]':>10} {'Busy [s]':>10} {'Files/s':>8} {'RTF':>7}")
+        for key, stats in sorted(self.stats.items()):
+            busyTime = max(stats["busyTime"], 1e-9)
+            rtf = stats["busyTime"] / stats["audioDuration"] if stats["audioDuration"] else float("nan")
+            print(f"{key:<40} {stats['files']:>6} {stats['failed']:>6} {stats['audioDuration']:>10.1f} {stats['busyTime']:>10.1f} "
+                  f"{stats['files'] / busyTime:>8.2f} {rtf:>7.3f}")
+        print(f"Total wall time: {elapsedTime:.1f}s")
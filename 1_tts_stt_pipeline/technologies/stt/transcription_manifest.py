@@ -0,0 +1,169 @@
+import os
+import json
+import time
+import hashlib
+import tempfile
+from pathlib import Path
+
+def writeJSONAtomic(path: str, data, indent: int = 4):
+    """Write a JSON-File via a temporary file and a rename, so a crash never leaves a partial file behind
+
+    Args:
+        path (str): Path to the JSON-File
+        data (Any): Data to be saved
+        indent (int, optional): Indentation of the JSON. Defaults to 4.
+    """
+    fd, tempPath = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, indent=indent)
+        os.replace(tempPath, path)
+    except BaseException:
+        os.remove(tempPath)
+        raise
+
+class TranscriptionManifest:
+    CONST_STATUS_DONE = "done"
+    CONST_STATUS_FAILED = "failed"
+    CONST_HASH_BLOCK_SIZE = 1 << 20 # Bytes read at once while hashing an audio file
+    CONST_FLUSH_EVERY = 50 # Recorded files after which the manifest is written to disk
+    CONST_FLUSH_INTERVAL = 30.0 # Seconds after which the manifest is written to disk, even with fewer recorded files
+
+    def __init__(self, path: str):
+        """Record of the transcribed files of one engine and model, so an interrupted run can be resumed.
+        Every audio file is stored with its hash, size and modification time, the path of its transcript and the time it took.
+
+        Args:
+            path (str): Path to the manifest (.json)
+        """
+        self.path = path
+        self.entries = {}
+        self.isModified = False
+        self.pendingEntries = 0
+        self.lastFlush = time.monotonic()
+        if os.path.exists(path):
+            try:
+                with open(path, "r") as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Could not read manifest {path}, starting a new one: {e}")
+
+    def getFileKey(self, file):
+        """Return the key of an audio file, its name, so the source folder can be moved
+
+        Args:
+            file (Any): Path to the audio file
+
+        Returns:
+            str: Key of the file
+        """
+        return Path(file).name
+
+    def getFileHash(self, file):
+        """Return the SHA-256 of an audio file
+
+        Args:
+            file (Any): Path to the audio file
+
+        Returns:
+            str: Hex digest of the file
+        """
+        sha = hashlib.sha256()
+        with open(file, "rb") as f:
+            while block := f.read(self.CONST_HASH_BLOCK_SIZE):
+                sha.update(block)
+        return sha.hexdigest()
+
+    def isDone(self, file):
+        """Check if a file has been transcribed and is unchanged since.
+        Size and modification time are compared first, the file is only hashed if the modification time differs.
+
+        Args:
+            file (Any): Path to the audio file
+
+        Returns:
+            bool: Transcript exists and belongs to the current file
+        """
+        entry = self.entries.get(self.getFileKey(file))
+        if entry is None or entry["status"] != self.CONST_STATUS_DONE or not os.path.exists(entry["output"]):
+            return False
+        stat = os.stat(file)
+        if stat.st_size != entry["size"]:
+            return False
+        if stat.st_mtime != entry["mtime"]:
+            # Touched, but maybe not changed, e.g. after copying the files
+            if self.getFileHash(file) != entry["hash"]:
+                return False
+            entry["mtime"] = stat.st_mtime
+            self.isModified = True
+        return True
+
+    def getPendingFiles(self, files: list):
+        """Return the files that are new, changed or failed before
+
+        Args:
+            files (list): Paths to the audio files
+
+        Returns:
+            list: Paths to the audio files to be transcribed
+        """
+        pending = [file for file in files if not self.isDone(file)]
+        if self.isModified:
+            # Keep the new modification times, so the files are not hashed again next run
+            self.save()
+        if len(pending) < len(files):
+            print(f"Skipping {len(files) - len(pending)} already transcribed files, {len(pending)} left")
+        return pending
+
+    def markDone(self, file, output: str, duration: float):
+        """Record a transcribed file, the manifest is saved every CONST_FLUSH_EVERY files or CONST_FLUSH_INTERVAL seconds
+
+        Args:
+            file (Any): Path to the audio file
+            output (str): Path to the transcript
+            duration (float): Seconds spent on the file
+        """
+        stat = os.stat(file)
+        self.entries[self.getFileKey(file)] = {
+            "status": self.CONST_STATUS_DONE,
+            "hash": self.getFileHash(file),
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "output": str(output),
+            "duration": duration
+        }
+        self.recordChange()
+
+    def markFailed(self, file, error: str, duration: float):
+        """Record a failed file, it is retried in the next run. Saved like markDone
+
+        Args:
+            file (Any): Path to the audio file
+            error (str): Error message
+            duration (float): Seconds spent on the file
+        """
+        self.entries[self.getFileKey(file)] = {"status": self.CONST_STATUS_FAILED, "error": error, "duration": duration}
+        self.recordChange()
+
+    def recordChange(self):
+        """Mark the manifest as modified and save it once enough files were recorded or enough time has passed.
+        Rewriting the whole manifest after every file would make a run quadratic in the number of files.
+        """
+        self.isModified = True
+        self.pendingEntries += 1
+        if self.pendingEntries >= self.CONST_FLUSH_EVERY or time.monotonic() - self.lastFlush >= self.CONST_FLUSH_INTERVAL:
+            self.save()
+
+    def flush(self):
+        """Save the manifest if anything was recorded since the last save, called at the end of a run and on errors
+        """
+        if self.isModified:
+            self.save()
+
+    def save(self):
+        """Save the manifest
+        """
+        writeJSONAtomic(self.path, self.entries)
+        self.isModified = False
+        self.pendingEntries = 0
+        self.lastFlush = time.monotonic()
@@ -2,11 +2,172 @@ import subprocess
 from utils.setup_helper import SetupHelper
 import os
 import json
+import math
+import time
+import wave
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import cffi
+import numpy as np
 from vosk import Model, KaldiRecognizer
-from pathlib import Path
 from utils.mongodb_handler import MongoDBHandler
+from technologies.stt.stt_engine import STTEngine
+from technologies.stt.transcription_manifest import writeJSONAtomic
+
+try:
+    from scipy.signal import resample_poly
+except ImportError:
+    # Fall back to linear interpolation if scipy is not installed
+    resample_poly = None
+
+CONST_CHUNK_SIZE = 64000 # Bytes of audio passed to the recognizer at once (2s of 16kHz 16bit mono)
+
+# Wraps buffers as cdata, so memoryview slices can be passed to the recognizer without copying them
+_ffi = cffi.FFI()
+
+# Model and recognizer of a worker process, set up once per process by initVoskWorker
+_workerModel = None
+_workerRecognizer = None
+
+def initVoskWorker(modelPath: str, sampleRate: int):
+    """Initialize a worker process with its own KaldiRecognizer. 
+    The model is only loaded if it has not been inherited from the parent process via fork.
+
+    Args:
+        modelPath (str): Path to the Vosk Model
+        sampleRate (int): Samplerate of the audio
+    """
+    global _workerModel, _workerRecognizer
+    if _workerModel is None:
+        _workerModel = Model(modelPath)
+    _workerRecognizer = KaldiRecognizer(_workerModel, sampleRate)
+
+def transcribeVoskWorker(file, savePath: str, sampleRate: int, chunkSize: int):
+    """Transcribe a single file inside a worker process and save the transcript
+
+    Args:
+        file (Any): Path to Audio file to be transcribed
+        savePath (str): Path to the JSON-File for the transcript
+        sampleRate (int): Samplerate of the audio
+        chunkSize (int): Bytes of audio passed to the recognizer at once
+
+    Returns:
+        str: Path to the saved transcript
+        float: Seconds spent on the file
+    """
+    startTime = time.perf_counter()
+    transcription = transcribeAudio(file, _workerRecognizer, sampleRate, chunkSize)
+    writeJSONAtomic(savePath, transcription)
+    return savePath, time.perf_counter() - startTime
+
+def resampleAudio(audio: np.ndarray, sourceRate: int, targetRate: int):
+    """Resample the audio to the target samplerate
+
+    Args:
+        audio (np.ndarray): Mono audio samples
+        sourceRate (int): Samplerate of the audio
+        targetRate (int): Samplerate to resample to
+
+    Returns:
+        np.ndarray: Resampled audio samples
+    """
+    if resample_poly is not None:
+        divisor = math.gcd(sourceRate, targetRate)
+        return resample_poly(audio, targetRate // divisor, sourceRate // divisor)
+    targetLength = int(round(len(audio) * targetRate / sourceRate))
+    return np.interp(np.arange(targetLength) * sourceRate / targetRate, np.arange(len(audio)), audio)
+
+def readWavAudio(file, sampleRate: int):
+    """Read a 16bit PCM WAV file in process and convert it to mono audio with the given samplerate
+
+    Args:
+        file (Any): Path to Audio file
+        sampleRate (int): Samplerate the recognizer expects
+
+    Returns:
+        np.ndarray: 16bit mono audio samples or None, if the file can't be read natively
+    """
+    try:
+        with wave.open(str(file), 'rb') as wav:
+            if wav.getsampwidth() != 2:
+                return None
+            channels = wav.getnchannels()
+            rate = wav.getframerate()
+            frames = wav.readframes(wav.getnframes())
+    except (wave.Error, EOFError):
+        return None
+    samples = np.frombuffer(frames, dtype='<i2')
+    if channels == 1 and rate == sampleRate:
+        return samples
+    audio = samples.reshape(-1, channels).mean(axis=1)
+    if rate != sampleRate:
+        audio = resampleAudio(audio, rate, sampleRate)
+    return np.clip(np.round(audio), -32768, 32767).astype('<i2')
+
+def readFFmpegAudio(file, sampleRate: int, chunkSize: int):
+    """Decode the audio with ffmpeg, for all formats that can't be read natively
+
+    Args:
+        file (Any): Path to Audio file
+        sampleRate (int): Samplerate the recognizer expects
+        chunkSize (int): Bytes of audio to read at once
+
+    Yields:
+        bytes: Chunk of 16bit mono audio
+    """
+    with subprocess.Popen(["ffmpeg", "-loglevel", "quiet", "-i",
+        file,
+        "-ar", str(sampleRate) , "-ac", "1", "-f", "s16le", "-"],
+        stdout=subprocess.PIPE) as process:
+        
+        # Read Data
+        while True:
+            # Read audio frame
+            partial_data = process.stdout.read(chunkSize)
+            
+            if len(partial_data) == 0:
+                break
+            yield partial_data
+
+def transcribeAudio(file, recognizer: KaldiRecognizer, sampleRate: int, chunkSize: int = CONST_CHUNK_SIZE):
+    """Transcribe the given audio file with the given recognizer
+
+    Args:
+        file (Any): Path to Audio file to be transcribed
+        recognizer (KaldiRecognizer): Loaded KaldiRecognizer for Transcription
+        sampleRate (int): Samplerate of the audio
+        chunkSize (int, optional): Bytes of audio passed to the recognizer at once. Defaults to CONST_CHUNK_SIZE.
+
+    Returns:
+        list: List of transcribed text chunks
+    """
+    # Save all snippets in this list
+    all_transcriptions = []
+    samples = readWavAudio(file, sampleRate)
+    if samples is None:
+        print(f"Can't read {file} natively, decoding with ffmpeg")
+        chunks = readFFmpegAudio(file, sampleRate, chunkSize)
+    else:
+        # Slices of the memoryview share the decoded buffer
+        audio = memoryview(samples).cast('B')
+        chunks = (_ffi.from_buffer(audio[offset:offset + chunkSize]) for offset in range(0, len(audio), chunkSize))
+    
+    for chunk in chunks:
+        # Pass the audio data to the recognizer
+        if recognizer.AcceptWaveform(chunk):
+            result = recognizer.Result()
+            decoded_result = json.loads(result)
+            all_transcriptions.append(decoded_result)
+    # Keep the tail of the audio before resetting the recognizer for the next file
+    final_result = json.loads(recognizer.FinalResult())
+    if final_result.get("text"):
+        all_transcriptions.append(final_result)
+    recognizer.Reset()
+    return all_transcriptions
+
+class TTSVosk(STTEngine):
+    CONST_TECHNOLOGY = "vosk"
 
-class TTSVosk: 
     def __init__(self):
         """Initialize TTSVosk by loading the config file
         """
@@ -17,90 +178,133 @@ class TTSVosk:
         self.CONST_MODEL_PATH = os.path.join(os.getcwd(), self.getModelSourcePath(), self.CONST_MODEL)
         self.CONST_SAMPLERATE = 16000
         
-    def transcribeFiles(self):
+    def transcribeFiles(self, workers: int = 1, chunkSize: int = CONST_CHUNK_SIZE):
         """Transcribe all files in the given source folder
+
+        Args:
+            workers (int, optional): Number of worker processes, each with its own recognizer. Defaults to 1.
+            chunkSize (int, optional): Bytes of audio passed to the recognizer at once. Defaults to CONST_CHUNK_SIZE.
         """
-        # Sort Files alphabetically
-        src = Path(self.getSourceDirectory())
-        src_sorted = sorted(src.iterdir(), key=lambda x: x.name)
-        
-        # Setup Output Folder
-        modelOutput = os.path.join(self.getOutputDirectory(), self.CONST_MODEL)
-        if not Path(modelOutput).exists():
-            print(f"Model-Folder not found. Creating Folder '{self.CONST_MODEL}' at {self.getOutputDirectory()}.")
-            Path(modelOutput).mkdir(parents=True, exist_ok=True)
-            
-        # Load Model
-        model = Model (self.CONST_MODEL_PATH)
-        
+        src_sorted = self.getSourceFiles()
+        if workers > 1:
+            self.transcribeFilesParallel(src_sorted, workers, chunkSize)
+            return
+        for _ in self.transcribeItems(self.CONST_MODEL, None, src_sorted, chunkSize=chunkSize):
+            pass
+
+    def loadModel(self, model, device, chunkSize: int = CONST_CHUNK_SIZE):
+        """Load the Vosk Model with a recognizer
+
+        Args:
+            model (Any): Name of the model, only CONST_MODEL is available
+            device (Any): Unused, Vosk runs on the CPU
+            chunkSize (int, optional): Bytes of audio passed to the recognizer at once. Defaults to CONST_CHUNK_SIZE.
+
+        Returns:
+            dict: Loaded model, recognizer and chunk size
+        """
+        voskModel = Model (self.CONST_MODEL_PATH)
         # Initialize recognizer with the model
-        recognizer = KaldiRecognizer(model, self.CONST_SAMPLERATE)  # Assuming the audio is 16kHz
+        recognizer = KaldiRecognizer(voskModel, self.CONST_SAMPLERATE)  # Assuming the audio is 16kHz
+        return {"model": voskModel, "recognizer": recognizer, "chunkSize": chunkSize}
+
+    def transcribeFile(self, loadedModel: dict, file):
+        """Transcribe a single file
+
+        Args:
+            loadedModel (dict): Model returned by loadModel
+            file (Any): Path to Audio file
+
+        Returns:
+            list: List of transcribed text chunks
+        """
+        return self.transcribe(file, loadedModel["model"], loadedModel["recognizer"], loadedModel["chunkSize"])
+    
+    def transcribeFilesParallel(self, files: list, workers: int, chunkSize: int = CONST_CHUNK_SIZE):
+        """Spread the transcription of the given files over a pool of worker processes.
+        With the fork start method the model is loaded once and shared with all workers, otherwise every worker loads it.
+        Files already transcribed according to the manifest are skipped, failed ones are retried.
+
+        Args:
+            files (list): Audio files to be transcribed
+            workers (int): Number of worker processes
+            chunkSize (int, optional): Bytes of audio passed to the recognizer at once. Defaults to CONST_CHUNK_SIZE.
+        """
+        global _workerModel
+        manifest = self.getManifest(self.CONST_MODEL)
+        files = manifest.getPendingFiles(files)
+        if not files:
+            return
+        mpContext = multiprocessing.get_context()
+        if mpContext.get_start_method() == "fork":
+            _workerModel = Model(self.CONST_MODEL_PATH)
         
-        for file in src_sorted:
-            print (f"Transcribing file: {file}")
-            # Prepare Outputfile
-            fileName = file.stem
-            saveFile = "vosk_" + self.CONST_MODEL + "_" + fileName + ".json"
-            savePath = os.path.join(modelOutput, saveFile)
-            transcription = self.transcribe(file, model, recognizer)
-            print(f"Saving transcript to file at {savePath}")
-            with open(savePath, 'w') as f:
-                json.dump(transcription, f, indent=4)
-            f.close()
+        print(f"Transcribing {len(files)} files with {workers} workers")
+        try:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=mpContext, initializer=initVoskWorker,
+                                     initargs=(self.CONST_MODEL_PATH, self.CONST_SAMPLERATE)) as executor:
+                futures = {}
+                for file in files:
+                    savePath = self.getTranscriptPath(self.CONST_MODEL, file)
+                    futures[executor.submit(transcribeVoskWorker, file, savePath, self.CONST_SAMPLERATE, chunkSize)] = file
+                for future in as_completed(futures):
+                    try:
+                        savePath, duration = future.result()
+                        print(f"Saving transcript to file at {savePath}")
+                        manifest.markDone(futures[future], savePath, duration)
+                    except Exception as e:
+                        print(f"Error while transcribing {futures[future]}: {e}")
+                        manifest.markFailed(futures[future], str(e), 0.0)
+        finally:
+            _workerModel = None
+            manifest.flush()
     
-    def transcribe(self, file, model: Model, recognizer: KaldiRecognizer):
+    def transcribe(self, file, model: Model, recognizer: KaldiRecognizer, chunkSize: int = CONST_CHUNK_SIZE):
         """Transcribe the given audio file
 
         Args:
             file (str): Path to Audio file to be transcribed
             model (Model): Loaded Vosk Model
             recognizer (KaldiRecognizer): Loaded KaldiRecognizer for Transcription
+            chunkSize (int, optional): Bytes of audio passed to the recognizer at once. Defaults to CONST_CHUNK_SIZE.
 
         Returns:
             list: List of transcribed text chunks
         """
-        # Save all snippets in this list
-        all_transcriptions = []
-        # Extract audio from the input file and pipe it to Vosk
-        with subprocess.Popen(["ffmpeg", "-loglevel", "quiet", "-i",
-            file,
-            "-ar", str(self.CONST_SAMPLERATE) , "-ac", "1", "-f", "s16le", "-"],
-            stdout=subprocess.PIPE) as process:
-            
-            # Read Data
-            while True:
-                # Read audio frame
-                partial_data = process.stdout.read(4000)  # Size of the audio chunks to process
-                
-                if len(partial_data) == 0:
-                    break
-                # Pass the audio data to the recognizer
-                if recognizer.AcceptWaveform(partial_data):
-                    result = recognizer.Result()
-                    decoded_result = json.loads(result)
-                    all_transcriptions.append(decoded_result)
-        recognizer.FinalResult()
-        recognizer.Reset()
-        return all_transcriptions
+        return transcribeAudio(file, recognizer, self.CONST_SAMPLERATE, chunkSize)
     
     def transferJSONFilesToMongoDB (self):
         """Transferring the generated JSON-Files to the MongoDB Instance
+
+        Returns:
+            dict: Counts of inserted, updated and failed items
+        """
+        # Upserting on the transcript key keeps reruns free of duplicates
+        result = self.mongodb_handler.upsertItems(self.readJSONFiles(), MongoDBHandler.CONST_TRANSCRIPT_KEY)
+        print(f"Transferred transcripts to MongoDB: {result['upserted']} new, {result['updated']} updated, {result['failed']} failed")
+        return result
+    
+    def readJSONFiles (self):
+        """Read the generated JSON-Files one after another
+
+        Yields:
+            dict: Object for MongoDB
         """
         # Get subfolders in Output directory to iterate through
         subfolders = [subfolder for subfolder in os.listdir(self.getOutputDirectory()) if os.path.isdir(os.path.join(self.getOutputDirectory(), subfolder))]
-        print(f"subdolders: {subfolders}")
+        print(f"subfolders: {subfolders}")
         for sf in subfolders:
             sf_path = os.path.join(self.getOutputDirectory(), sf)
             print(f"sf_path: {sf_path}")
             for file in os.listdir(sf_path):
+                # Skip leftovers of interrupted atomic writes
+                if not file.endswith(".json"):
+                    continue
                 file_info = file.split("_")
                 file_path = os.path.join(sf_path, file)
                 with open (file_path, "r") as f:
                     file_data = json.load(f)
-                newObject = self.createNewRecappMongoDBObject(file,file_info, file_data)
-                print(f"adding new item: {sf_path}")
-                self.mongodb_handler.addNewItem(newObject)
-                f.close()
+                yield self.createNewRecappMongoDBObject(file,file_info, file_data)
     
     def mergeVoskTranscript(self, rawData: list):
         """Merge all single line chunks into one text.
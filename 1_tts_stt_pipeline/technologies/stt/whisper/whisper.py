@@ -1,12 +1,17 @@
 from utils.setup_helper import SetupHelper
 from utils.mongodb_handler import MongoDBHandler
+from technologies.stt.stt_engine import STTEngine
 import os
 import json
+import time
+import contextlib
 import whisper
-from pathlib import Path
 import torch
 
-class TTSWhisper:
+class TTSWhisper(STTEngine):
+    CONST_TECHNOLOGY = "whisper"
+    CONST_BATCH_SIZE = 8 # How many files are decoded and sent through the model at once
+    
     def __init__(self):
         """Initialize TTS Whisper by loading the config file
         """
@@ -22,49 +27,187 @@ class TTSWhisper:
             device (Any): CUDA Device or CPU
             language (Any): What language is the text
         """
+        for _ in self.transcribeItems(model, device, self.getSourceFiles(), language=language):
+            pass
+
+    def loadModel(self, model, device, language=None):
+        """Load a Whisper Model
+
+        Args:
+            model (Any): Whisper Model
+            device (Any): CUDA Device or CPU
+            language (Any, optional): What language is the text. Defaults to None.
+
+        Returns:
+            dict: Loaded model with device and language
+        """
+        return {"model": whisper.load_model(model, device=device), "device": device, "language": language}
+
+    def transcribeFile(self, loadedModel: dict, file):
+        """Transcribe a single file
+
+        Args:
+            loadedModel (dict): Model returned by loadModel
+            file (Any): Path to Audio file
+
+        Returns:
+            dict: Transcript of Whisper
+        """
+        device = loadedModel["device"]
+        with self.getDeviceContext(device):
+            return loadedModel["model"].transcribe(str(file), language=loadedModel["language"], fp16=self.isCUDADevice(device))
+
+    def transcribeFilesBatched(self, model, device, language, batch_size: int = CONST_BATCH_SIZE):
+        """Transcribe all files with the given model, processing several files at once.
+        Every file is cut into 30s windows, all windows of a batch are featurized and run through the encoder and decoder as one tensor.
+        Files already transcribed according to the manifest are skipped, failed ones are retried.
+
+        Opt-in only, transcribeFiles stays the default: the windows are fixed and do not overlap, so words at a window edge are split,
+        every window is decoded greedily without timestamps, without the temperature fallback and without conditioning on the text before it.
+        The transcripts are therefore not comparable with those of transcribe() and must not be mixed with them in one evaluation.
+
+        Args:
+            model (Any): Whisper Model
+            device (Any): CUDA Device or CPU
+            language (Any): What language is the text
+            batch_size (int, optional): How many files are processed at once. Defaults to CONST_BATCH_SIZE.
+
+        Returns:
+            dict: Processed files, audio duration and elapsed time of the run
+        """
+        manifest = self.getManifest(model)
+        src_sorted = manifest.getPendingFiles(self.getSourceFiles())
+        if not src_sorted:
+            return {"files": 0, "audioDuration": 0.0, "elapsedTime": 0.0}
         whisp_model = whisper.load_model(model, device=device)
-        modelOutput = os.path.join(self.getOutputDirectory(), model)
-        
-        # Sort Files alphabetically
-        src = Path(self.getSourceDirectory())
-        src_sorted = sorted(src.iterdir(), key=lambda x: x.name)
-        
-        # Setup Output Folder
-        if not Path(modelOutput).exists():
-            print(f"Model-Folder not found. Creating Folder '{model}' at {self.getOutputDirectory()}.")
-            Path(modelOutput).mkdir(parents=True, exist_ok=True)
-        
-        for file in src_sorted:
-            print (f"Transcribing file: {file}")
-            # Prepare Outputfile
-            fileName = file.stem
-            saveFile = "whisper_" + model + "_" + fileName + ".json"
-            savePath = os.path.join(modelOutput, saveFile)
-            # Start transcription
-            with torch.cuda.device(device):
-                result = whisp_model.transcribe(str(file), language=language, fp16=False)
-            jsonResult = json.dumps(result, indent=4)
-            print(f"Saving transcript to file at {savePath}")
-            with open(savePath, 'w') as f:
-                f.write(jsonResult)
-            f.close()
-            
+        options = whisper.DecodingOptions(language=language, fp16=self.isCUDADevice(device), without_timestamps=True)
+
+        audioDuration = 0.0
+        startTime = time.perf_counter()
+        try:
+            for batchStart in range(0, len(src_sorted), batch_size):
+                batchFiles = src_sorted[batchStart:batchStart + batch_size]
+                batchStartTime = time.perf_counter()
+                try:
+                    print(f"Transcribing batch of {len(batchFiles)} files, starting with: {batchFiles[0]}")
+                    # Decode and featurize all files of the batch, remembering which window belongs to which file
+                    mels = []
+                    windowOwners = []
+                    for fileIndex, file in enumerate(batchFiles):
+                        audio = whisper.load_audio(str(file))
+                        audioDuration += len(audio) / whisper.audio.SAMPLE_RATE
+                        for offset in range(0, max(len(audio), 1), whisper.audio.N_SAMPLES):
+                            window = audio[offset:offset + whisper.audio.N_SAMPLES]
+                            mels.append(whisper.log_mel_spectrogram(whisper.pad_or_trim(window), whisp_model.dims.n_mels))
+                            windowStart = offset / whisper.audio.SAMPLE_RATE
+                            windowOwners.append((fileIndex, windowStart, windowStart + len(window) / whisper.audio.SAMPLE_RATE))
+                    # Run all windows through the model as one batch
+                    with self.getDeviceContext(device):
+                        results = whisper.decode(whisp_model, torch.stack(mels).to(whisp_model.device), options)
+
+                    # The batch is processed as a whole, so its time is split evenly over its files
+                    fileDuration = (time.perf_counter() - batchStartTime) / len(batchFiles)
+                    for fileIndex, file in enumerate(batchFiles):
+                        fileWindows = [(start, end, res) for (owner, start, end), res in zip(windowOwners, results) if owner == fileIndex]
+                        savePath = self.getTranscriptPath(model, file)
+                        self.saveTranscript(savePath, self.createBatchedTranscript(fileWindows, language))
+                        manifest.markDone(file, savePath, fileDuration)
+                except Exception as e:
+                    fileDuration = (time.perf_counter() - batchStartTime) / len(batchFiles)
+                    print(f"Error while transcribing {', '.join(str(file) for file in batchFiles)}: {e}")
+                    for file in batchFiles:
+                        if not manifest.isDone(file):
+                            manifest.markFailed(file, str(e), fileDuration)
+        finally:
+            # The manifest is only saved every few files, the rest is written at the end of the run or when it is interrupted
+            manifest.flush()
+
+        elapsedTime = time.perf_counter() - startTime
+        print(f"Transcribed {len(src_sorted)} files with '{model}' in {elapsedTime:.1f}s "
+              f"({len(src_sorted) / elapsedTime:.2f} files/s, real-time factor {elapsedTime / max(audioDuration, 1e-9):.3f})")
+        return {"files": len(src_sorted), "audioDuration": audioDuration, "elapsedTime": elapsedTime}
+
+    def createBatchedTranscript(self, fileWindows: list, language):
+        """Merge the decoded windows of one file into the same layout whisp_model.transcribe() returns
+
+        Args:
+            fileWindows (list): Tuples of window start and end in seconds and its DecodingResult
+            language (Any): What language is the text
+
+        Returns:
+            dict: Transcript with text, segments and language
+        """
+        segments = []
+        for index, (start, end, res) in enumerate(fileWindows):
+            segments.append({
+                "id": index,
+                "seek": int(start * whisper.audio.FRAMES_PER_SECOND),
+                "start": start,
+                "end": end,
+                "text": res.text,
+                "tokens": res.tokens,
+                "temperature": res.temperature,
+                "avg_logprob": res.avg_logprob,
+                "compression_ratio": res.compression_ratio,
+                "no_speech_prob": res.no_speech_prob
+            })
+        text = " ".join(segment["text"].strip() for segment in segments if segment["text"].strip())
+        return {"text": text, "segments": segments, "language": language}
+
+    def isCUDADevice(self, device):
+        """Check if the given device is a CUDA device
+
+        Args:
+            device (Any): CUDA Device or CPU
+
+        Returns:
+            bool: Is CUDA device
+        """
+        return str(device).startswith("cuda")
+
+    def getDeviceContext(self, device):
+        """Return the context to run the model in, CPU needs no CUDA context
+
+        Args:
+            device (Any): CUDA Device or CPU
+
+        Returns:
+            Any: Context Manager for the device
+        """
+        if self.isCUDADevice(device):
+            return torch.cuda.device(device)
+        return contextlib.nullcontext()
+
     def transferJSONFilesToMongoDB (self):
         """Transferring the generated JSON-Files to the MongoDB Instance
+
+        Returns:
+            dict: Counts of inserted, updated and failed items
+        """
+        # Upserting on the transcript key keeps reruns free of duplicates
+        result = self.mongodb_handler.upsertItems(self.readJSONFiles(), MongoDBHandler.CONST_TRANSCRIPT_KEY)
+        print(f"Transferred transcripts to MongoDB: {result['upserted']} new, {result['updated']} updated, {result['failed']} failed")
+        return result
+    
+    def readJSONFiles (self):
+        """Read the generated JSON-Files one after another
+
+        Yields:
+            dict: Object for MongoDB
         """
         # Get subfolders in Output directory to iterate through
         subfolders = [subfolder for subfolder in os.listdir(self.getOutputDirectory()) if os.path.isdir(os.path.join(self.getOutputDirectory(), subfolder))]
         for sf in subfolders:
             sf_path = os.path.join(self.getOutputDirectory(), sf)
             for file in os.listdir(sf_path):
+                # Skip leftovers of interrupted atomic writes
+                if not file.endswith(".json"):
+                    continue
                 file_info = file.split("_")
                 file_path = os.path.join(sf_path, file)
                 with open (file_path, "r") as f:
                     file_data = json.load(f)
-                newObject = self.createNewWhisperMongoDBObject(file,file_info, file_data["text"], file_data)
-                print(f"adding new item: {newObject}")
-                self.mongodb_handler.addNewItem(newObject)
-                f.close()
+                yield self.createNewWhisperMongoDBObject(file,file_info, file_data["text"], file_data)
 
     def createNewWhisperMongoDBObject (self, fileName, fileinfo, transcript, rawdata):
         """Creating a MongoDB Object for Whisper 
@@ -0,0 +1,149 @@
+import os
+import wave
+import contextlib
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from utils.audio_array import AudioArray
+
+class AmbientMixer:
+    CONST_DBFS_VALUES_TO_SET_TO = [-35, -30, -25, -20, -15]
+    CONST_BLOCK_SIZE = 65536 # Frames mixed at once when streaming
+
+    # Decoded ambient tracks of this process, keyed by path, framerate and channels
+    _ambientCache = {}
+
+    def __init__(self, outputDir: str, dbfsValues: list = CONST_DBFS_VALUES_TO_SET_TO):
+        """Initialize the mixing engine for dialogues and ambient tracks
+
+        Args:
+            outputDir (str): Directory to save the mixed files to
+            dbfsValues (list, optional): Target volumes of the ambient layer in dBFS. Defaults to CONST_DBFS_VALUES_TO_SET_TO.
+        """
+        self.outputDir = outputDir
+        self.dbfsValues = list(dbfsValues)
+
+    def loadAmbient(self, path: str, frameRate: int, channels: int):
+        """Return the ambient track converted to the framerate and channels of the dialogue, decoding it only once per process
+
+        Args:
+            path (str): Path to the ambient file
+            frameRate (int): Framerate of the dialogue
+            channels (int): Channels of the dialogue
+
+        Returns:
+            AudioArray: Ambient audio
+            float: Average loudness in dBFS
+        """
+        key = (str(path), frameRate, channels)
+        if key not in self._ambientCache:
+            ambient = AudioArray.fromFile(str(path), frameRate, channels)
+            # Copy out of a memory-mapped file, the array is reused for every dialogue
+            ambient = AudioArray(np.array(ambient.samples, dtype=np.float32), frameRate)
+            self._ambientCache[key] = (ambient, ambient.dBFS())
+        return self._ambientCache[key]
+
+    def mergeAmbientAndDialogue(self, dialogue: str, bg: str):
+        """Merge the ambient soundtrack with the spoken dialogue for every target volume.
+        Both files are decoded once, the ambient is looped to the length of the dialogue and scaled per target volume.
+
+        Args:
+            dialogue (str): Path to the Dialog-Audiofile
+            bg (str): Path to the Ambient-Audiofile
+
+        Returns:
+            list: Paths of the merged files
+        """
+        dialogue_name = os.path.splitext(os.path.basename(dialogue))[0].replace("_full", "")
+        ambient_name = os.path.splitext(os.path.basename(bg))[0]
+
+        dialogue_sound = AudioArray.fromFile(str(dialogue))
+        ambient_sound, cur_volume = self.loadAmbient(bg, dialogue_sound.frameRate, dialogue_sound.channels)
+        print(f"Current dBFS for Ambient (average loudness): {cur_volume}dBFS")
+
+        # Loop the ambient sound and trim it to the duration of the dialogue
+        looped_ambient = ambient_sound.fitTo(dialogue_sound.frames)
+
+        exported = []
+        for target_dbfs in self.dbfsValues:
+            adjust_volume = target_dbfs - cur_volume
+            print (f"Merging {dialogue_name} and {ambient_name} with volume adjustments of {adjust_volume} dBFS to reach {target_dbfs}dBFS.")
+            combined = dialogue_sound.overlay(looped_ambient.applyGain(adjust_volume))
+
+            export_path = os.path.join(self.outputDir, f"{dialogue_name}_{ambient_name}_{target_dbfs}dBFS.wav")
+            combined.writeWav(export_path)
+            exported.append(export_path)
+        print(f"Merging completed for {dialogue_name} and {ambient_name}.")
+        return exported
+
+    def mergeAmbientAndDialogueStreaming(self, dialogue: str, bg: str, blockSize: int = CONST_BLOCK_SIZE):
+        """Merge the ambient soundtrack with the spoken dialogue for every target volume in a single pass.
+        The dialogue is read block by block, every block is mixed at all target volumes at once and appended to one open file per volume,
+        so memory stays the same for conversations of any length.
+
+        Args:
+            dialogue (str): Path to the Dialog-Audiofile
+            bg (str): Path to the Ambient-Audiofile
+            blockSize (int, optional): Frames mixed at once. Defaults to CONST_BLOCK_SIZE.
+
+        Returns:
+            list: Paths of the merged files
+        """
+        dialogue_name = os.path.splitext(os.path.basename(dialogue))[0].replace("_full", "")
+        ambient_name = os.path.splitext(os.path.basename(bg))[0]
+
+        # WAV-Files are memory-mapped, only the current block is read from disk
+        dialogue_sound = AudioArray.fromFile(str(dialogue))
+        ambient_sound, cur_volume = self.loadAmbient(bg, dialogue_sound.frameRate, dialogue_sound.channels)
+        print(f"Current dBFS for Ambient (average loudness): {cur_volume}dBFS")
+        print(f"Merging {dialogue_name} and {ambient_name} to reach {self.dbfsValues} dBFS in one pass.")
+
+        if ambient_sound.frames == 0:
+            # Empty ambient file: loop a single silent frame, like fitTo does in mergeAmbientAndDialogue
+            ambient_sound = AudioArray(np.zeros((1, dialogue_sound.channels), dtype=np.float32), dialogue_sound.frameRate)
+        # One gain per target volume, broadcast over the frames and channels of a block
+        # A silent ambient (-inf dBFS) can't be scaled to a volume, its gain would be infinite
+        gains = np.power(10, (np.array(self.dbfsValues) - cur_volume) / 20) if np.isfinite(cur_volume) else np.zeros(len(self.dbfsValues))
+        gains = gains.astype(np.float32).reshape(-1, 1, 1)
+        export_paths = [os.path.join(self.outputDir, f"{dialogue_name}_{ambient_name}_{target_dbfs}dBFS.wav") for target_dbfs in self.dbfsValues]
+
+        with contextlib.ExitStack() as stack:
+            writers = [stack.enter_context(wave.open(path, "wb")) for path in export_paths]
+            for writer in writers:
+                writer.setnchannels(dialogue_sound.channels)
+                writer.setsampwidth(2)
+                writer.setframerate(dialogue_sound.frameRate)
+
+            for start in range(0, dialogue_sound.frames, blockSize):
+                dialogue_block = dialogue_sound.samples[start:start + blockSize].astype(np.float32)
+                # Loop the ambient sound by wrapping around its end
+                ambient_block = np.take(ambient_sound.samples, np.arange(start, start + len(dialogue_block)) % ambient_sound.frames, axis=0)
+                # Same rounding as AudioArray.toInt16, so both merge paths write identical samples
+                mixed = AudioArray.roundToInt16(dialogue_block + ambient_block * gains)
+                for writer, block in zip(writers, mixed):
+                    writer.writeframesraw(block.astype("<i2", copy=False).tobytes())
+        print(f"Merging completed for {dialogue_name} and {ambient_name}.")
+        return export_paths
+
+    def mergeAll(self, dialogueFiles: list, ambientFiles: list, workers: int = None, streaming: bool = False):
+        """Merge every dialogue with every ambient track, spreading the pairs over a pool of processes
+
+        Args:
+            dialogueFiles (list): Paths to the dialogue files
+            ambientFiles (list): Paths to the ambient files
+            workers (int, optional): Number of processes. Defaults to the number of CPUs.
+            streaming (bool, optional): Write all target volumes in one pass over the dialogue. Defaults to False.
+
+        Returns:
+            list: Paths of the merged files
+        """
+        merge = self.mergeAmbientAndDialogueStreaming if streaming else self.mergeAmbientAndDialogue
+        exported = []
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(merge, dialogue, bg): (dialogue, bg)
+                       for dialogue in dialogueFiles for bg in ambientFiles}
+            for future in as_completed(futures):
+                try:
+                    exported.extend(future.result())
+                except Exception as e:
+                    print(f"Error while merging {futures[future]}: {e}")
+        return exported
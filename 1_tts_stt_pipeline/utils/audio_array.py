@@ -0,0 +1,350 @@
+import struct
+import subprocess
+import numpy as np
+
+try:
+    from scipy.signal import resample_poly # type: ignore
+except ImportError:
+    resample_poly = None
+
+class AudioArray:
+    CONST_MAX_AMPLITUDE = 32768 # Maximum amplitude of 16bit audio
+    CONST_WAV_HEADER_SIZE = 44 # Size of a canonical PCM WAV header
+    CONST_WAV_FORMATS = (1, 0xFFFE) # PCM and WAVE_FORMAT_EXTENSIBLE
+
+    def __init__(self, samples: np.ndarray, frameRate: int):
+        """Audio held as one array of samples, replacing pydub's immutable AudioSegment
+
+        Args:
+            samples (np.ndarray): Samples with shape (frames, channels), int16 or float32 scaled to 16bit
+            frameRate (int): Framerate
+        """
+        if samples.ndim == 1:
+            samples = samples.reshape(-1, 1)
+        self.samples = samples
+        self.frameRate = frameRate
+
+    @property
+    def frames(self):
+        return self.samples.shape[0]
+
+    @property
+    def channels(self):
+        return self.samples.shape[1]
+
+    @property
+    def duration(self):
+        """Duration in seconds"""
+        return self.frames / self.frameRate
+
+    def msToFrames(self, duration: float):
+        """Convert a duration in milliseconds into frames at the framerate of this audio
+
+        Args:
+            duration (float): Duration in milliseconds
+
+        Returns:
+            int: Number of frames
+        """
+        return int(round(duration * self.frameRate / 1000))
+
+    @classmethod
+    def silent(cls, duration: float, frameRate: int, channels: int = 1):
+        """Create silence
+
+        Args:
+            duration (float): Duration in milliseconds
+            frameRate (int): Framerate
+            channels (int, optional): Channels. Defaults to 1.
+
+        Returns:
+            AudioArray: Silent audio
+        """
+        frames = int(round(duration * frameRate / 1000))
+        return cls(np.zeros((frames, channels), dtype=np.int16), frameRate)
+
+    @classmethod
+    def concatenate(cls, clips: list, gap: float = 0):
+        """Join clips into one preallocated array, adding silence after every clip.
+        All clips are converted to the framerate and channels of the first one.
+
+        Args:
+            clips (list): AudioArrays to join
+            gap (float, optional): Silence after every clip in milliseconds. Defaults to 0.
+
+        Returns:
+            AudioArray: Joined audio
+        """
+        if not clips:
+            raise ValueError("No clips to concatenate")
+        frameRate, channels = clips[0].frameRate, clips[0].channels
+        clips = [clip.convert(frameRate, channels) for clip in clips]
+        gapFrames = int(round(gap * frameRate / 1000))
+        dtype = np.result_type(*[clip.samples.dtype for clip in clips])
+
+        samples = np.zeros((sum(clip.frames for clip in clips) + gapFrames * len(clips), channels), dtype=dtype)
+        position = 0
+        for clip in clips:
+            samples[position:position + clip.frames] = clip.samples
+            position += clip.frames + gapFrames
+        return cls(samples, frameRate)
+
+    @classmethod
+    def readWav(cls, path: str):
+        """Read a 16bit PCM WAV-File through a memory-mapped buffer, without copying it into memory
+
+        Args:
+            path (str): Path to the WAV-File
+
+        Returns:
+            AudioArray: Audio backed by the file, read-only
+        """
+        channels, frameRate, dataOffset, dataSize = cls.readWavHeader(path)
+        frames = dataSize // (2 * channels)
+        if frames == 0:
+            return cls(np.zeros((0, channels), dtype=np.int16), frameRate)
+        samples = np.memmap(path, dtype="<i2", mode="r", offset=dataOffset, shape=(frames, channels))
+        return cls(samples, frameRate)
+
+    @classmethod
+    def readWavHeader(cls, path: str):
+        """Walk the RIFF chunks of a WAV-File to find its format and sample data
+
+        Args:
+            path (str): Path to the WAV-File
+
+        Returns:
+            int: Channels
+            int: Framerate
+            int: Offset of the sample data in bytes
+            int: Size of the sample data in bytes
+        """
+        with open(path, "rb") as f:
+            riff, _, wave = struct.unpack("<4sI4s", f.read(12))
+            if riff != b"RIFF" or wave != b"WAVE":
+                raise ValueError(f"{path} is not a WAV-File")
+            fmt = None
+            while True:
+                header = f.read(8)
+                if len(header) < 8:
+                    raise ValueError(f"{path} has no data chunk")
+                chunkID, chunkSize = struct.unpack("<4sI", header)
+                if chunkID == b"fmt ":
+                    fmt = struct.unpack("<HHIIHH", f.read(16))
+                    f.seek(chunkSize - 16 + chunkSize % 2, 1)
+                elif chunkID == b"data":
+                    if fmt is None:
+                        raise ValueError(f"{path} has no fmt chunk")
+                    audioFormat, channels, frameRate, _, _, bitsPerSample = fmt
+                    if audioFormat not in cls.CONST_WAV_FORMATS or bitsPerSample != 16:
+                        raise ValueError(f"{path} is not 16bit PCM")
+                    dataOffset = f.tell()
+                    # Piped encoders leave the size open, the data then runs to the end of the file
+                    fileSize = f.seek(0, 2)
+                    return channels, frameRate, dataOffset, min(chunkSize, fileSize - dataOffset)
+                else:
+                    f.seek(chunkSize + chunkSize % 2, 1)
+
+    @classmethod
+    def decode(cls, path: str, frameRate: int = None, channels: int = None):
+        """Decode any audio file ffmpeg can read (e.g. .mp3) into 16bit samples
+
+        Args:
+            path (str): Path to the audio file
+            frameRate (int, optional): Framerate to convert to. Defaults to the framerate of the file.
+            channels (int, optional): Channels to convert to. Defaults to the channels of the file.
+
+        Returns:
+            AudioArray: Decoded audio
+        """
+        if frameRate is None or channels is None:
+            probe = subprocess.run(["ffprobe", "-v", "error", "-select_streams", "a:0", "-show_entries", "stream=sample_rate,channels",
+                                    "-of", "csv=p=0", str(path)], capture_output=True, text=True, check=True)
+            fileRate, fileChannels = probe.stdout.strip().split(",")
+            frameRate = frameRate or int(fileRate)
+            channels = channels or int(fileChannels)
+        result = subprocess.run(["ffmpeg", "-v", "error", "-i", str(path), "-f", "s16le", "-acodec", "pcm_s16le",
+                                 "-ac", str(channels), "-ar", str(frameRate), "-"], capture_output=True, check=True)
+        return cls(np.frombuffer(result.stdout, dtype="<i2").reshape(-1, channels), frameRate)
+
+    @classmethod
+    def fromFile(cls, path: str, frameRate: int = None, channels: int = None):
+        """Load an audio file, mapping WAV-Files directly and decoding everything else with ffmpeg
+
+        Args:
+            path (str): Path to the audio file
+            frameRate (int, optional): Framerate to convert to. Defaults to the framerate of the file.
+            channels (int, optional): Channels to convert to. Defaults to the channels of the file.
+
+        Returns:
+            AudioArray: Loaded audio
+        """
+        try:
+            audio = cls.readWav(path)
+        except ValueError:
+            return cls.decode(path, frameRate, channels)
+        return audio.convert(frameRate or audio.frameRate, channels or audio.channels)
+
+    def writeWav(self, path: str):
+        """Write the audio as 16bit PCM WAV-File, filling the samples through a memory-mapped buffer
+
+        Args:
+            path (str): Path to the WAV-File
+        """
+        dataSize = self.frames * self.channels * 2
+        with open(path, "wb") as f:
+            f.write(self.getWavHeader(self.frameRate, self.channels, dataSize))
+            f.truncate(self.CONST_WAV_HEADER_SIZE + dataSize)
+        if dataSize == 0:
+            return
+        target = np.memmap(path, dtype="<i2", mode="r+", offset=self.CONST_WAV_HEADER_SIZE, shape=self.samples.shape)
+        target[:] = self.toInt16().samples
+        target.flush()
+        del target
+
+    @classmethod
+    def getWavHeader(cls, frameRate: int, channels: int, dataSize: int):
+        """Build the header of a 16bit PCM WAV-File
+
+        Args:
+            frameRate (int): Framerate
+            channels (int): Channels
+            dataSize (int): Size of the sample data in bytes
+
+        Returns:
+            bytes: WAV header
+        """
+        blockAlign = channels * 2
+        return struct.pack("<4sI4s4sIHHIIHH4sI", b"RIFF", 36 + dataSize, b"WAVE", b"fmt ", 16, 1, channels,
+                           frameRate, frameRate * blockAlign, blockAlign, 16, b"data", dataSize)
+
+    def convert(self, frameRate: int, channels: int):
+        """Convert to another framerate and number of channels
+
+        Args:
+            frameRate (int): Target framerate
+            channels (int): Target channels
+
+        Returns:
+            AudioArray: Converted audio, itself if nothing changes
+        """
+        audio = self
+        if channels != audio.channels:
+            if channels == 1:
+                samples = audio.samples.mean(axis=1, keepdims=True, dtype=np.float32)
+            elif audio.channels == 1:
+                samples = np.repeat(audio.samples, channels, axis=1)
+            else:
+                raise ValueError(f"Cannot convert {audio.channels} to {channels} channels")
+            audio = AudioArray(samples, audio.frameRate)
+        if frameRate != audio.frameRate:
+            audio = AudioArray(self.resample(audio.samples, audio.frameRate, frameRate), frameRate)
+        return audio
+
+    def resample(self, samples: np.ndarray, sourceRate: int, targetRate: int):
+        """Resample every channel to the target framerate
+
+        Args:
+            samples (np.ndarray): Samples with shape (frames, channels)
+            sourceRate (int): Framerate of the samples
+            targetRate (int): Target framerate
+
+        Returns:
+            np.ndarray: Resampled samples as float32
+        """
+        samples = samples.astype(np.float32)
+        if resample_poly is not None:
+            divisor = np.gcd(sourceRate, targetRate)
+            return resample_poly(samples, targetRate // divisor, sourceRate // divisor, axis=0).astype(np.float32)
+        # Fallback without scipy: linear interpolation
+        frames = int(round(len(samples) * targetRate / sourceRate))
+        positions = np.arange(frames) * (sourceRate / targetRate)
+        source = np.arange(len(samples))
+        return np.stack([np.interp(positions, source, samples[:, c]) for c in range(samples.shape[1])], axis=1).astype(np.float32)
+
+    def rms(self):
+        """Root mean square of all samples
+
+        Returns:
+            float: RMS
+        """
+        if self.frames == 0:
+            return 0.0
+        return float(np.sqrt(np.mean(np.square(self.samples, dtype=np.float64))))
+
+    def dBFS(self):
+        """Average loudness in dBFS, measured like pydub's AudioSegment.dBFS
+
+        Returns:
+            float: Loudness in dBFS
+        """
+        rms = self.rms()
+        if rms == 0:
+            return -float("inf")
+        return 20 * np.log10(rms / self.CONST_MAX_AMPLITUDE)
+
+    def applyGain(self, gain: float):
+        """Change the volume
+
+        Args:
+            gain (float): Gain in dB
+
+        Returns:
+            AudioArray: Audio as float32
+        """
+        return AudioArray(self.samples.astype(np.float32) * np.float32(10 ** (gain / 20)), self.frameRate)
+
+    def fitTo(self, frames: int):
+        """Loop or crop the audio to exactly the given number of frames
+
+        Args:
+            frames (int): Number of frames
+
+        Returns:
+            AudioArray: Looped or cropped audio
+        """
+        if frames <= self.frames:
+            return AudioArray(self.samples[:frames], self.frameRate)
+        if self.frames == 0:
+            return AudioArray(np.zeros((frames, self.channels), dtype=self.samples.dtype), self.frameRate)
+        return AudioArray(np.resize(self.samples, (frames, self.channels)), self.frameRate)
+
+    def overlay(self, other: "AudioArray", loop: bool = False):
+        """Mix another audio on top of this one, keeping the length of this one like pydub's overlay
+
+        Args:
+            other (AudioArray): Audio to mix in
+            loop (bool, optional): Loop the other audio to cover this one entirely. Defaults to False.
+
+        Returns:
+            AudioArray: Mixed audio as float32
+        """
+        other = other.convert(self.frameRate, self.channels)
+        if loop:
+            other = other.fitTo(self.frames)
+        frames = min(self.frames, other.frames)
+        mixed = self.samples.astype(np.float32)
+        mixed[:frames] += other.samples[:frames]
+        return AudioArray(mixed, self.frameRate)
+
+    def toInt16(self):
+        """Round to 16bit samples, clipping what exceeds the range
+
+        Returns:
+            AudioArray: Audio as int16
+        """
+        if self.samples.dtype == np.int16:
+            return self
+        return AudioArray(self.roundToInt16(self.samples), self.frameRate)
+
+    @classmethod
+    def roundToInt16(cls, samples: np.ndarray):
+        """Round float samples of any shape to 16bit, clipping what exceeds the range
+
+        Args:
+            samples (np.ndarray): Float samples
+
+        Returns:
+            np.ndarray: Samples as int16
+        """
+        return np.clip(np.rint(samples), -cls.CONST_MAX_AMPLITUDE, cls.CONST_MAX_AMPLITUDE - 1).astype(np.int16)
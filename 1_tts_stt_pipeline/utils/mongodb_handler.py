@@ -1,9 +1,93 @@
-from pymongo import MongoClient
+import atexit
+import threading
+from pymongo import MongoClient, InsertOne, UpdateOne, ASCENDING
 from pymongo.database import Database
 from pymongo.collection import Collection
-from pymongo.errors import PyMongoError, ConnectionFailure
+from pymongo.errors import PyMongoError, ConnectionFailure, BulkWriteError, OperationFailure
+
+class MongoClientRegistry:
+    # Defaults for every client, can be overwritten with the client options from the config
+    CONST_CLIENT_OPTIONS = {
+        "maxPoolSize": 50,
+        "connectTimeoutMS": 10000,
+        "serverSelectionTimeoutMS": 10000
+    }
+    
+    _clients = {}
+    _references = {}
+    _lock = threading.Lock()
+    
+    @classmethod
+    def acquire(cls, host: str, port: int, options: dict = None):
+        """Return the pooled client for host and port, creating it on first use. 
+        Every call needs a matching release.
+
+        Args:
+            host (str): URL of MongoDB Instance
+            port (int): Port to be accessed on
+            options (dict, optional): Options for the MongoClient (e.g. maxPoolSize, compressors, timeouts). Only used when the client is created.
+
+        Returns:
+            MongoClient: Shared MongoDB Client
+        """
+        key = (host, int(port))
+        with cls._lock:
+            if key not in cls._clients:
+                print(f"Creating pooled MongoDB client for {host}:{port}")
+                cls._clients[key] = MongoClient(host, int(port), **{**cls.CONST_CLIENT_OPTIONS, **(options or {})})
+                cls._references[key] = 0
+            cls._references[key] += 1
+            return cls._clients[key]
+    
+    @classmethod
+    def release(cls, host: str, port: int):
+        """Release a client acquired before, closing it when nobody uses it anymore
+
+        Args:
+            host (str): URL of MongoDB Instance
+            port (int): Port to be accessed on
+        """
+        key = (host, int(port))
+        with cls._lock:
+            if key not in cls._clients:
+                return
+            cls._references[key] -= 1
+            if cls._references[key] <= 0:
+                cls._clients.pop(key).close()
+                del cls._references[key]
+    
+    @classmethod
+    def closeAll(cls):
+        """Close all clients, called when the process exits
+        """
+        with cls._lock:
+            for client in cls._clients.values():
+                client.close()
+            cls._clients.clear()
+            cls._references.clear()
+
+atexit.register(MongoClientRegistry.closeAll)
 
 class MongoDBHandler:
+    CONST_BATCH_SIZE = 1000 # Operations sent to MongoDB per bulk write
+    CONST_TRANSCRIPT_KEY = ["technology", "model", "fileName"] # Identifies a transcript in the transcription collection
+    
+    # Indexes of the collection of each instance, as (keys, options), created once at start-up with ensureIndexes
+    CONST_INDEXES = {
+        "recapp": [
+            ([("taskID", ASCENDING)], {}),
+            ([("fileName", ASCENDING)], {}),
+            ([("sentStatus", ASCENDING), ("serverStatus", ASCENDING)], {}),
+            ([("serverStatus", ASCENDING), ("downloadStatus", ASCENDING)], {})
+        ],
+        "transcripts": [
+            ([(key, ASCENDING) for key in CONST_TRANSCRIPT_KEY], {"unique": True}),
+            ([("technology", ASCENDING), ("model", ASCENDING), ("convoID", ASCENDING)], {}),
+            ([("convoID", ASCENDING)], {}),
+            ([("excludeGeneral", ASCENDING)], {})
+        ]
+    }
+    
     client: MongoClient
     db: Database
     collection: Collection
@@ -19,38 +103,73 @@ class MongoDBHandler:
         """
         
         print("Initializing MongoDB Handler")
+        self.host = self.port = None
+        self.client = None
+        self.indexSpec = None
         try:
+            self.host = config['db_host']
+            self.port = config['db_port']
+            # All handlers share one pooled client per host and port
+            self.client = MongoClientRegistry.acquire(self.host, self.port, config.get('db_client_options'))
             match instance:
                 case "piper":
-                    self.client = MongoClient(config['db_host'], config['db_port'])
                     self.db = self.client[config['db_name']]
                     self.collection = self.db[config['db_collection']]
                 case "recapp":
-                    self.client = MongoClient(config['db_host'], config['db_port'])
                     self.db = self.client[config['recapp_db_name']]
                     self.collection = self.db[config['req_collection']]
+                    self.indexSpec = "recapp"
                 case "whisper":
-                    self.client = MongoClient(config['db_host'], config['db_port'])
                     self.db = self.client[config['transcript_db']]
                     self.collection = self.db[config['transcript_collection']]
+                    self.indexSpec = "transcripts"
                 case "vosk":
-                    self.client = MongoClient(config['db_host'], config['db_port'])
                     self.db = self.client[config['transcript_db']]
                     self.collection = self.db[config['transcript_collection']]
+                    self.indexSpec = "transcripts"
                 case "metrics":
-                    self.client = MongoClient(config['db_host'], config['db_port'])
                     self.db = self.client[config['transcript_db']]
                     self.collection = self.db[config['transcript_collection']]
+                    self.indexSpec = "transcripts"
                 case _:
-                    self.client = MongoClient(config['db_host'], config['db_port'])
+                    pass
         except ConnectionFailure:
             print(f"Error while connecting to MongoDB Instance")
+            self.resetConnection()
         # Catch any other exceptions
         except Exception as e:
             print(f"An unexpected error occurred: {e}")
-            self.client = None
-            self.db = None
-            self.collection = None
+            self.resetConnection()
+
+    def resetConnection(self):
+        """Release the shared client after a failed initialization, so its reference is not leaked
+        """
+        self.disconnectMongoDB()
+        self.db = None
+        self.collection = None
+
+    def ensureIndexes(self, indexSpec: str = None):
+        """Create the indexes of the given spec on the current collection, if they don't exist yet.
+        Called once at start-up (or before a transfer), not on every initialization, since each index costs a round trip.
+
+        Args:
+            indexSpec (str, optional): Key of the spec in CONST_INDEXES. Defaults to the spec of the instance.
+        """
+        indexSpec = indexSpec or self.indexSpec
+        if indexSpec is None or self.collection is None:
+            return
+        for keys, options in self.CONST_INDEXES[indexSpec]:
+            try:
+                self.collection.create_index(keys, **options)
+            except ConnectionFailure as e:
+                # Every further index would wait for the server selection timeout as well
+                print(f"Error while connecting to MongoDB Instance, skipping indexes: {e}")
+                return
+            except OperationFailure as e:
+                # A unique index can't be built while the collection still contains duplicates
+                print(f"Error creating index {keys} on '{self.collection.name}': {e}")
+            except PyMongoError as e:
+                print(f"Error creating index {keys}: {e}")
 
     def getSingleItemByID(self, searchString: str):
         """Find single Item in collection based on search string.
@@ -138,14 +257,120 @@ class MongoDBHandler:
             # Catch any other exceptions
             print(f"An unexpected error occurred: {e}")
             return None
+
+    def addItems(self, items, batchSize: int = CONST_BATCH_SIZE):
+        """Add multiple items to the collection with batched bulk writes.
+
+        Args:
+            items (Iterable[dict]): New Objects to Add
+            batchSize (int, optional): Items per bulk write. Defaults to CONST_BATCH_SIZE.
+
+        Returns:
+            dict: Counts of inserted, matched, updated, upserted and failed items and the error messages
+        """
+        return self.bulkWrite((InsertOne(item) for item in items), batchSize)
+    
+    def upsertItems(self, items, keyFields: list, batchSize: int = CONST_BATCH_SIZE):
+        """Insert multiple items or update the items with the same key with batched bulk writes.
+        Fields of existing items that are not part of the new item are kept.
+
+        Args:
+            items (Iterable[dict]): Objects to insert or replace
+            keyFields (list): Fields identifying an item
+            batchSize (int, optional): Items per bulk write. Defaults to CONST_BATCH_SIZE.
+
+        Returns:
+            dict: Counts of inserted, matched, updated, upserted and failed items and the error messages
+        """
+        return self.bulkWrite((UpdateOne({key: item[key] for key in keyFields}, {'$set': item}, upsert=True) for item in items), batchSize)
+    
+    def updateMany(self, updates, batchSize: int = CONST_BATCH_SIZE):
+        """Update multiple items, each with its own filter and new values, with batched bulk writes.
+
+        Args:
+            updates (Iterable[tuple]): Pairs of filter criteria and new values to set
+            batchSize (int, optional): Updates per bulk write. Defaults to CONST_BATCH_SIZE.
+
+        Returns:
+            dict: Counts of inserted, matched, updated, upserted and failed items and the error messages
+        """
+        return self.bulkWrite((UpdateOne(searchString, newValues) for searchString, newValues in updates), batchSize)
+    
+    def bulkWrite(self, operations, batchSize: int = CONST_BATCH_SIZE):
+        """Send write operations (e.g. UpdateOne, InsertOne) to the collection in unordered bulk writes of batchSize operations.
+
+        Args:
+            operations (Iterable): Write operations from pymongo
+            batchSize (int, optional): Operations per bulk write. Defaults to CONST_BATCH_SIZE.
+
+        Returns:
+            dict: Counts of inserted, matched, updated, upserted and failed items and the error messages
+        """
+        result = {"inserted": 0, "matched": 0, "updated": 0, "upserted": 0, "failed": 0, "errors": []}
+        batch = []
+        for operation in operations:
+            batch.append(operation)
+            if len(batch) >= batchSize:
+                self.writeBatch(batch, result)
+                batch = []
+        if batch:
+            self.writeBatch(batch, result)
+        return result
+    
+    def writeBatch(self, batch: list, result: dict):
+        """Write a single batch and add its counts to the result
+
+        Args:
+            batch (list): Write operations from pymongo
+            result (dict): Counts to add to
+        """
+        try:
+            res = self.collection.bulk_write(batch, ordered=False)
+            result["inserted"] += res.inserted_count
+            result["matched"] += res.matched_count
+            result["updated"] += res.modified_count
+            result["upserted"] += res.upserted_count
+        except BulkWriteError as e:
+            # The unordered bulk write still applied all other operations
+            details = e.details
+            result["inserted"] += details.get("nInserted", 0)
+            result["matched"] += details.get("nMatched", 0)
+            result["updated"] += details.get("nModified", 0)
+            result["upserted"] += details.get("nUpserted", 0)
+            result["failed"] += len(details.get("writeErrors", []))
+            result["errors"].extend(error.get("errmsg", "") for error in details.get("writeErrors", []))
+        except PyMongoError as e:
+            result["failed"] += len(batch)
+            result["errors"].append(str(e))
+    
+    def iterQuery(self, query: dict = None, projection: dict = None, batchSize: int = CONST_BATCH_SIZE):
+        """Stream the items matching the query, fetching batchSize items per round trip
+
+        Args:
+            query (dict, optional): Query to search collection. Defaults to all items.
+            projection (dict, optional): Fields to return. Defaults to all fields.
+            batchSize (int, optional): Items fetched per round trip. Defaults to CONST_BATCH_SIZE.
+
+        Yields:
+            dict: Database Object
+        """
+        try:
+            for item in self.collection.find(query or {}, projection, batch_size=batchSize):
+                yield item
+        except PyMongoError as e:
+            # Re-raised, a silently truncated result would look complete to the caller
+            print (f"Error finding item: {e}")
+            raise
                     
     def disconnectMongoDB(self):
-        """Disconnects the current MongoDB Connection
+        """Releases the shared MongoDB Client, which is closed once no handler uses it anymore
 
         Returns:
             Nothing
         """
-        self.client.close()
+        if self.client is not None:
+            MongoClientRegistry.release(self.host, self.port)
+            self.client = None
     
     def searchByQuery(self, query):
         """Search multiple items in collection matching the query
@@ -4,6 +4,68 @@ from typing import List
 from models.PiperTTSElement import PiperTTSElement
 from models.SpeakerElement import SpeakerElement
 
+class SpeakerRegistry:
+    def __init__(self):
+        """Speakers of one dialog, indexed by (name, lastname) and by first name to avoid scanning lists for every line
+        """
+        self.identifiedSpeakers: List[SpeakerElement] = [] # contains all Speakers
+        self.aliases: List[SpeakerElement] = []
+        self.noMatches: List[SpeakerElement] = []
+        self.identifiedNames = set() # (name, lastname) of identified speakers
+        self.aliasNames = set()
+        self.noMatchNames = set()
+        self.speakersByFirstName = {}
+        self.speakersByFullName = {}
+
+    def addIdentifiedSpeaker(self, speaker: SpeakerElement):
+        """Add a speaker that gets its own voice
+
+        Args:
+            speaker (SpeakerElement): Speaker to add
+        """
+        self.identifiedSpeakers.append(speaker)
+        self.identifiedNames.add((speaker.name, speaker.lastname))
+        # Keep the first speaker per key, matching used to take the first one in the list
+        self.speakersByFirstName.setdefault(speaker.name, speaker)
+        self.speakersByFullName.setdefault((speaker.name, speaker.lastname, speaker.fullname), speaker)
+
+    def addAlias(self, alias: SpeakerElement):
+        """Add a speaker, that could be a variation of an identified speaker
+
+        Args:
+            alias (SpeakerElement): Speaker to add
+        """
+        self.aliases.append(alias)
+        self.aliasNames.add(alias.name)
+
+    def addNoMatch(self, speaker: SpeakerElement):
+        """Add a speaker, that could not be matched with an identified speaker
+
+        Args:
+            speaker (SpeakerElement): Speaker to add
+        """
+        self.noMatches.append(speaker)
+        self.noMatchNames.add(speaker.name)
+
+    def isIdentified(self, name: str, lastName: str):
+        return (name, lastName) in self.identifiedNames
+
+    def findSpeaker(self, name: str, lastName: str, fullName: str):
+        """Find the identified speaker of a formatted speaker name
+
+        Args:
+            name (str): Name of the speaker
+            lastName (str): Last name of the speaker, if it exists
+            fullName (str): Full Name of the speaker
+
+        Returns:
+            SpeakerElement: Identified speaker or None
+        """
+        # If speaker consists of only 1 element, the first name is enough
+        if lastName == '':
+            return self.speakersByFirstName.get(name)
+        return self.speakersByFullName.get((name, lastName, fullName))
+
 class PiperDialogHandler:
     CONST_DIALOG_ELEMENTS = 2 #Dialog is always 'Speaker: "Spoken Text"', seperated by ":"
     CONST_MAP_NUMERICAL_REPLACER = {
@@ -12,12 +74,31 @@ class PiperDialogHandler:
         3: 'White',
         4: 'Tabula'
     }
-    
-    def __init__(self):
+    CONST_LOG_DEBUG = 10 # Every step of the speaker matching
+    CONST_LOG_INFO = 20 # Summary per dialog
+    CONST_LOG_WARNING = 30 # Only problems
+
+    def __init__(self, logLevel: int = CONST_LOG_INFO):
         """Constructor
+
+        Args:
+            logLevel (int, optional): Messages below this level are neither built nor printed. Defaults to CONST_LOG_INFO.
         """
-        pass
-      
+        self.logLevel = logLevel
+        # Speaker strings repeat on every line of a dialog and across dialogs, each is parsed once
+        self.formattedSpeakers = {}
+
+    def isLogging(self, level: int):
+        """Check if messages of a level are printed
+
+        Args:
+            level (int): Level of the message
+
+        Returns:
+            bool: Messages are printed
+        """
+        return level >= self.logLevel
+
     def processTextFromMongoDB(self, textToBeProcessed):
         """Process text to not contain any unnecessary spaces or line breaks.
 
@@ -32,12 +113,27 @@ class PiperDialogHandler:
         # Split the dialogue into lines
         processed_text = normalized_text.split('\n')
         return processed_text
-    
+
     def formatSpeaker(self, speakerName: str):
-        """Return the parts of the name from a speaker
+        """Return the parts of the name from a speaker, parsing every speaker string only once
 
         Args:
-            speakerName (str): Full Speaker identification 
+            speakerName (str): Full Speaker identification
+
+        Returns:
+            name: Name of the speaker
+            lastName: Last name of speaker, if it exists
+            fullName: Full Name of the speaker
+        """
+        if speakerName not in self.formattedSpeakers:
+            self.formattedSpeakers[speakerName] = self.parseSpeaker(speakerName)
+        return self.formattedSpeakers[speakerName]
+
+    def parseSpeaker(self, speakerName: str):
+        """Split a speaker into the parts of the name
+
+        Args:
+            speakerName (str): Full Speaker identification
 
         Returns:
             name: Name of the speaker
@@ -46,12 +142,13 @@ class PiperDialogHandler:
         """
         name = lastName = fullName = ''
         parts = speakerName.split()
-        
+
         if len(parts) > 1:  # if there are 2 parts in the speaker name
             name = parts[0]
             lastName = parts[1]  # lastname is the last element
             if lastName.isdigit():
-                print("Lastname is actually a integer, replacing with name")
+                if self.isLogging(self.CONST_LOG_DEBUG):
+                    print("Lastname is actually a integer, replacing with name")
                 tempName = lastName
                 lastName = self.CONST_MAP_NUMERICAL_REPLACER[int(tempName)]
                 fullName = f"{name} {lastName}"
@@ -62,76 +159,73 @@ class PiperDialogHandler:
             name = speakerName
             fullName = speakerName
         return name, lastName, fullName
-    
-    def identifyAllSpeakers(self, speakerEle: PiperTTSElement, speaker_count: int, allIdentifiedSpeakers: List[SpeakerElement], allUnidentifiedSpeakers: List[SpeakerElement]):
+
+    def identifyAllSpeakers(self, speakerEle: PiperTTSElement, speaker_count: int, registry: SpeakerRegistry):
         """Identifying the speaker of a given PiperTTSElement, incrementing the counter of speakers to match a voice later on.
 
         Args:
             speakerEle (PiperTTSElement): Spoken Dialog with Speaker and Text
             speaker_count (int): speaker identification
-            allIdentifiedSpeakers (List[SpeakerElement]): List of all Identified Speakers
-            allUnidentifiedSpeakers (List[SpeakerElement]): List of all Unidentified Speakers
+            registry (SpeakerRegistry): Speakers of the dialog
 
         Returns:
             int: speaker count after identification.
         """
-        name = lastName = fullName = str('')
         #Get the current Speaker from the dialog line
         speaker = speakerEle.speaker
         #Split into Name and Last name -> Bob Builder -> Bob / Builder
         name, lastName, fullName = self.formatSpeaker(speaker)
-        
-        # if name and lastname is not in list and both contain values        
-        if (not any(name == person.name and lastName == person.lastname for person in allIdentifiedSpeakers)) and \
-            (name and lastName):
-            print(f"New name '{name} {lastName}' to add to names-list")
-            allIdentifiedSpeakers.append(SpeakerElement(speaker_count, name, lastName, fullName))
+
+        # if name and lastname is not in list and both contain values
+        if (name and lastName) and not registry.isIdentified(name, lastName):
+            if self.isLogging(self.CONST_LOG_DEBUG):
+                print(f"New name '{name} {lastName}' to add to names-list")
+            registry.addIdentifiedSpeaker(SpeakerElement(speaker_count, name, lastName, fullName))
             speaker_count += 1
         else:
             #is already in Identified Speakers
-            print(f"Element { speakerEle.element_id } already identified")
-            if (not any(speaker == alias_speaker.name for alias_speaker in allUnidentifiedSpeakers)) and \
-            (not any(name == person.name and lastName == person.lastname for person in allIdentifiedSpeakers)):
-                print(f"New Alias, add {speaker} to alias-list.")
-                allUnidentifiedSpeakers.append(SpeakerElement(0, name, lastName, fullName))
-        return speaker_count;        
-        
-    def lookForAliases (self, aliasToBeChecked: SpeakerElement, identifiedSpeakers: List[SpeakerElement], noMatchesList: List[SpeakerElement]):
+            if self.isLogging(self.CONST_LOG_DEBUG):
+                print(f"Element { speakerEle.element_id } already identified")
+            if (speaker not in registry.aliasNames) and not registry.isIdentified(name, lastName):
+                if self.isLogging(self.CONST_LOG_DEBUG):
+                    print(f"New Alias, add {speaker} to alias-list.")
+                registry.addAlias(SpeakerElement(0, name, lastName, fullName))
+        return speaker_count
+
+    def lookForAliases (self, aliasToBeChecked: SpeakerElement, registry: SpeakerRegistry):
         """Check if a name has a variation in the list of identified speakers (missing lastname)
 
         Args:
             aliasToBeChecked (SpeakerElement): SpeakerElement-Object of the speaker to be checked
-            identifiedSpeakers (List[SpeakerElement]): List of all identified Speakers in the dialog.
-            noMatchesList (List[SpeakerElement]): List of all speakers that could not be matched with the identified speakers.
+            registry (SpeakerRegistry): Speakers of the dialog
         """
-        foundMatch = False
-        print(f"Checking unmapped User: {aliasToBeChecked.fullname}")
-        for speaker in identifiedSpeakers:
-            print(f"Comparing to Speaker: {speaker.fullname}")
-            if aliasToBeChecked.name == speaker.name:
+        if self.isLogging(self.CONST_LOG_DEBUG):
+            print(f"Checking unmapped User: {aliasToBeChecked.fullname}")
+        if aliasToBeChecked.name in registry.speakersByFirstName:
+            if self.isLogging(self.CONST_LOG_DEBUG):
                 print ("Found a match")
-                foundMatch = True
-                break
-        if not foundMatch and (not any(aliasToBeChecked.name == noMatch.name for noMatch in noMatchesList)):
-            print ("no match found, adding to nomatches found")
-            noMatchesList.append(aliasToBeChecked)
-                    
-    def createRandomSpeakers(self, id, speaker: SpeakerElement, allSpeakers: List[SpeakerElement]):
+        elif aliasToBeChecked.name not in registry.noMatchNames:
+            if self.isLogging(self.CONST_LOG_DEBUG):
+                print ("no match found, adding to nomatches found")
+            registry.addNoMatch(aliasToBeChecked)
+
+    def createRandomSpeakers(self, id, speaker: SpeakerElement, registry: SpeakerRegistry):
         """If the Speaker could not be identified, a incrementing number will be added as the voice to be used in the synthesizing.
 
         Args:
             id (Any): Voice-ID to add
             speaker (SpeakerElement): What SpeakerElement needs to be modified
-            allSpeakers (List[SpeakerElement]): List of all speakers
+            registry (SpeakerRegistry): Speakers of the dialog
 
         Returns:
             _type_: Returning incremented ID for later use.
         """
-        print(f"Adding increasing voice_id to unidentified speaker: {speaker}")
-        allSpeakers.append(SpeakerElement(id, speaker.name, speaker.lastname, speaker.fullname))
+        if self.isLogging(self.CONST_LOG_DEBUG):
+            print(f"Adding increasing voice_id to unidentified speaker: {speaker}")
+        registry.addIdentifiedSpeaker(SpeakerElement(id, speaker.name, speaker.lastname, speaker.fullname))
         id += 1
         return id
-                   
+
     def getDialogueParticipantsInformation(self, completeDialog: List[PiperTTSElement]):
         """Identify all Speakers in a given dialog
 
@@ -141,29 +235,29 @@ class PiperDialogHandler:
         Returns:
             len(name_list): number of Speakers in a text
             list[SpeakerElement]: Identified speakers
+            SpeakerRegistry: Index of the speakers to assign voices
         """
-        # temp dictionary and counter to save found names
-        name_list: List[SpeakerElement] = [] #contains all Speakers
-        alias_list: List[SpeakerElement] = [] 
-        nomatchesfound_list: List[SpeakerElement] = []
+        registry = SpeakerRegistry()
         speaker_count = 1
         #Iterate through the whole converstation line by line
         for element in completeDialog:
-            speaker_count = self.identifyAllSpeakers(element, speaker_count, name_list, alias_list)
-        
-        print(f"Current speakers: {len(name_list)} \n {name_list}")
-        print(f"Not mapped speakers: {len(alias_list)}\n {alias_list}\nStarting to map unmapped speakers")
-        print(f"speaker count after mapping all speakers: {speaker_count} (should be 1 bigger than current speakers)")
-        
-        for unmapped_speaker in alias_list:
-            self.lookForAliases(unmapped_speaker, name_list, nomatchesfound_list)
-        
-        print(f"unmapped user after alias matching: {nomatchesfound_list}")
-        
-        for element in nomatchesfound_list:
-            speaker_count = self.createRandomSpeakers(speaker_count, element, name_list)
-
-        return len(name_list), name_list
+            speaker_count = self.identifyAllSpeakers(element, speaker_count, registry)
+
+        if self.isLogging(self.CONST_LOG_DEBUG):
+            print(f"Current speakers: {len(registry.identifiedSpeakers)} \n {registry.identifiedSpeakers}")
+            print(f"Not mapped speakers: {len(registry.aliases)}\n {registry.aliases}\nStarting to map unmapped speakers")
+            print(f"speaker count after mapping all speakers: {speaker_count} (should be 1 bigger than current speakers)")
+
+        for unmapped_speaker in registry.aliases:
+            self.lookForAliases(unmapped_speaker, registry)
+
+        if self.isLogging(self.CONST_LOG_DEBUG):
+            print(f"unmapped user after alias matching: {registry.noMatches}")
+
+        for element in registry.noMatches:
+            speaker_count = self.createRandomSpeakers(speaker_count, element, registry)
+
+        return len(registry.identifiedSpeakers), registry.identifiedSpeakers, registry
 
     # Work througn 1 Conversation
     def initDialogue(self, id, dialogRawText):
@@ -187,24 +281,28 @@ class PiperDialogHandler:
             #Filter Descriptors with no spoken text.
             if ((len(dialog_paragraph) == self.CONST_DIALOG_ELEMENTS) and (dialog_paragraph[1] != '')):
                 dialogparts_list.append(PiperTTSElement(
-                    id, 
-                    index, 
-                    dialog_paragraph[0].strip(), 
+                    id,
+                    index,
+                    dialog_paragraph[0].strip(),
                     dialog_paragraph[1].strip().replace('\"',''))
                 )
-        print(f"List with objects {dialogparts_list}")        
+        if self.isLogging(self.CONST_LOG_DEBUG):
+            print(f"List with objects {dialogparts_list}")
 
-        numOfSpeakers, speakers = self.getDialogueParticipantsInformation(dialogparts_list)
-        print (f"Identified Speakers: {numOfSpeakers}")
-        print(f"Speakers: {speakers}")
-        
+        numOfSpeakers, speakers, registry = self.getDialogueParticipantsInformation(dialogparts_list)
+        if self.isLogging(self.CONST_LOG_INFO):
+            print (f"Identified Speakers: {numOfSpeakers}")
+            print(f"Speakers: {speakers}")
+
+        # Assign all voices in one pass over the dialog
         for element in dialogparts_list:
-            self.addVoiceModelToSpeakerDialog(speakers, element)
-            
-        print (f"Finished list after matching voice_id:\n")
-        print(dialogparts_list)
+            self.addVoiceModelToSpeakerDialog(registry, element)
+
+        if self.isLogging(self.CONST_LOG_DEBUG):
+            print (f"Finished list after matching voice_id:\n")
+            print(dialogparts_list)
         return dialogparts_list, numOfSpeakers, speakers
-    
+
     def voiceModelSelector(self, modelID):
         """Select a PiperTTS Voice Model to use
 
@@ -215,45 +313,32 @@ class PiperDialogHandler:
             str: Path to Model file
         """
         match modelID:
-                case 1: 
+                case 1:
                     return os.path.join("voices", "thorsten", "de_DE-thorsten-high.onnx")
-                case 2: 
+                case 2:
                     return os.path.join("voices", "kerstin", "de_DE-kerstin-low.onnx")
-                case 3: 
+                case 3:
                     return os.path.join("voices", "ramona", "de_DE-ramona-low.onnx")
-                case 4: 
+                case 4:
                     return os.path.join("voices", "karlsson", "de_DE-karlsson-low.onnx")
-                case 5: 
+                case 5:
                     return os.path.join("voices", "pavoque", "de_DE-pavoque-low.onnx")
-                case default: 
+                case default:
                     return os.path.join("voices", "thorsten", "de_DE-thorsten-high.onnx")
-    
-    def addVoiceModelToSpeakerDialog (self, speakers: List[SpeakerElement], dialogelement: PiperTTSElement):
-        """Work through list of speakers, adding their corresponding voice-model ID to their Text to mimic a authentic conversation.
+
+    def addVoiceModelToSpeakerDialog (self, registry: SpeakerRegistry, dialogelement: PiperTTSElement):
+        """Add the voice-model ID of the speaker to the dialog element to mimic a authentic conversation.
 
         Args:
-            speakers (List[SpeakerElement]): List of all Speakers
+            registry (SpeakerRegistry): Speakers of the dialog
             dialogelement (PiperTTSElement): PiperTTSElement containing the dialog to be syntzesized.
         """
-        print(f"Speaker to identify: {dialogelement.speaker}")
-        matchFound = False
-        for speaker in speakers:
-            currentSpeakerToBeMatched = dialogelement.speaker
-            # More than 2 elements before the text -> paramedic 1 to paramedic 2: "Text"
-            name, lastName , fullName = self.formatSpeaker(currentSpeakerToBeMatched)
-            # If speaker consists of only 1 element
-            if (lastName == ''):
-                if ((name == speaker.name)):
-                    print(f"Identified {dialogelement.speaker}")
-                    dialogelement.voice = speaker.speaker_num
-                    matchFound = True
-            else:
-                if ((name == speaker.name)) and (fullName == speaker.fullname) and (lastName == speaker.lastname):
-                    print(f"Identified {dialogelement.speaker}")
-                    dialogelement.voice = speaker.speaker_num
-                    matchFound = True
-            if matchFound:
-                break
-        if not matchFound:
+        # More than 2 elements before the text -> paramedic 1 to paramedic 2: "Text"
+        speaker = registry.findSpeaker(*self.formatSpeaker(dialogelement.speaker))
+        if speaker is not None:
+            if self.isLogging(self.CONST_LOG_DEBUG):
+                print(f"Identified {dialogelement.speaker}")
+            dialogelement.voice = speaker.speaker_num
+        else:
             # If after all there is a mismatch, set voice to 0 to assign random voice
-            dialogelement.voice = 0
\ No newline at end of file
+            dialogelement.voice = 0
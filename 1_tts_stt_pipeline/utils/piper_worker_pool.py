@@ -0,0 +1,225 @@
+import os
+import json
+import shutil
+import tempfile
+import threading
+import subprocess
+import collections
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from utils.audio_array import AudioArray
+from utils.tts_cache import TTSCache
+
+class PiperWorker:
+    CONST_STDERR_LINES = 20 # Lines of Piper's log kept to report errors
+
+    def __init__(self, piperExe: str, modelFile: str, workDir: str, piperArgs: list = None):
+        """One long-running Piper process holding a single voice model
+
+        Args:
+            piperExe (str): Path to the Piper executable
+            modelFile (str): Path to the voice model (.onnx)
+            workDir (str): Directory Piper writes its WAV-Files to before they are read into memory
+            piperArgs (list, optional): Additional arguments for Piper, e.g. ["--length_scale", "1.1"]. Defaults to None.
+        """
+        self.piperExe = piperExe
+        self.modelFile = modelFile
+        self.workDir = workDir
+        self.piperArgs = list(piperArgs or [])
+        self.process = None
+        self.stderr = collections.deque(maxlen=self.CONST_STDERR_LINES)
+        self.lock = threading.Lock()
+
+    def start(self):
+        """Start Piper, which loads the voice model once and then reads JSON lines from stdin
+        """
+        print(f"Starting Piper for voice model {self.modelFile}")
+        self.process = subprocess.Popen(
+            [self.piperExe, "--model", self.modelFile, "--json-input", "--output_dir", self.workDir, *self.piperArgs],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding="utf-8",
+            bufsize=1,
+            cwd=os.path.dirname(self.piperExe) or None
+        )
+        # Piper logs to stderr, it needs to be drained or the process blocks
+        threading.Thread(target=self.drainStderr, daemon=True).start()
+
+    def drainStderr(self):
+        """Keep the last lines Piper logged
+        """
+        for line in self.process.stderr:
+            self.stderr.append(line.rstrip())
+
+    def isRunning(self):
+        """Check if the Piper process is alive
+
+        Returns:
+            bool: Is running
+        """
+        return self.process is not None and self.process.poll() is None
+
+    def synthesize(self, text: str):
+        """Synthesize one line of text
+
+        Args:
+            text (str): Text to be synthesized
+
+        Returns:
+            AudioArray: Synthesized audio, held in memory
+        """
+        with self.lock:
+            if not self.isRunning():
+                self.start()
+            # JSON escapes all special characters, so no encoding of the shell is involved
+            self.process.stdin.write(json.dumps({"text": text}) + "\n")
+            self.process.stdin.flush()
+            # Piper answers every line with the path of the written file
+            outputPath = self.process.stdout.readline().strip()
+            if not outputPath:
+                raise RuntimeError(f"Piper stopped for voice model {self.modelFile}: {' | '.join(self.stderr)}")
+            try:
+                audio = AudioArray.readWav(outputPath)
+                return AudioArray(np.array(audio.samples), audio.frameRate)
+            finally:
+                os.remove(outputPath)
+
+    def close(self):
+        """Close stdin to let Piper finish and end the process
+        """
+        if self.process is None:
+            return
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+        self.process = None
+
+class PiperWorkerPool:
+    def __init__(self, piperExe: str, piperDir: str, voiceModelSelector, cache: TTSCache = None, piperArgs: list = None):
+        """Pool of Piper processes, one per voice model, that are started on first use and kept alive
+
+        Args:
+            piperExe (str): Path to the Piper executable
+            piperDir (str): Parent folder of the voice models
+            voiceModelSelector (Callable): Maps a voice ID to the relative path of its voice model, e.g. PiperDialogHandler.voiceModelSelector
+            cache (TTSCache, optional): Cache to look up utterances before synthesizing them. Defaults to None.
+            piperArgs (list, optional): Additional arguments for Piper, e.g. ["--length_scale", "1.1"]. Defaults to None.
+        """
+        self.piperExe = piperExe
+        self.piperDir = piperDir
+        self.voiceModelSelector = voiceModelSelector
+        self.cache = cache
+        self.piperArgs = list(piperArgs or [])
+        self.piperVersion = None
+        # Prefer shared memory, so the intermediate WAV-Files never hit the disk
+        self.workDir = tempfile.mkdtemp(prefix="piper_", dir="/dev/shm" if os.path.isdir("/dev/shm") else None)
+        self.workers = {}
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def getModelFile(self, voiceID: int):
+        """Return the path to the voice model of a voice
+
+        Args:
+            voiceID (int): Voice-ID
+
+        Returns:
+            str: Path to the voice model
+        """
+        return os.path.join(self.piperDir, self.voiceModelSelector(voiceID))
+
+    def getPiperVersion(self):
+        """Return the version of Piper, part of the cache key since other versions may sound different
+
+        Returns:
+            str: Version reported by Piper, or size and modification time of the executable if it reports none
+        """
+        if self.piperVersion is None:
+            try:
+                result = subprocess.run([self.piperExe, "--version"], capture_output=True, text=True, timeout=30)
+                self.piperVersion = result.stdout.strip() if result.returncode == 0 else ""
+            except (OSError, subprocess.TimeoutExpired):
+                self.piperVersion = ""
+            if not self.piperVersion:
+                stat = os.stat(self.piperExe)
+                self.piperVersion = f"{stat.st_size}-{int(stat.st_mtime)}"
+        return self.piperVersion
+
+    def getWorker(self, voiceID: int):
+        """Return the worker of a voice, starting it if needed. Voice IDs sharing a model share the worker
+
+        Args:
+            voiceID (int): Voice-ID
+
+        Returns:
+            PiperWorker: Worker of the voice model
+        """
+        modelFile = self.getModelFile(voiceID)
+        with self.lock:
+            if modelFile not in self.workers:
+                worker = PiperWorker(self.piperExe, modelFile, self.workDir, self.piperArgs)
+                worker.start()
+                self.workers[modelFile] = worker
+            return self.workers[modelFile]
+
+    def synthesize(self, text: str, voiceID: int):
+        """Synthesize one line of text with the model of the given voice, using the cache if there is one
+
+        Args:
+            text (str): Text to be synthesized
+            voiceID (int): Voice-ID
+
+        Returns:
+            AudioArray: Synthesized audio
+        """
+        if self.cache is None:
+            return self.getWorker(voiceID).synthesize(text)
+        key = self.cache.getKey(text, self.voiceModelSelector(voiceID), self.getPiperVersion(), {"args": self.piperArgs})
+        audio = self.cache.get(key)
+        if audio is None:
+            audio = self.getWorker(voiceID).synthesize(text)
+            self.cache.put(key, audio)
+        return audio
+
+    def synthesizeAll(self, lines: list):
+        """Synthesize many lines, running the different voices concurrently. Lines of the same voice are processed in order.
+
+        Args:
+            lines (list): Tuples of text and Voice-ID
+
+        Returns:
+            list: AudioArrays in the order of the lines
+        """
+        # One thread per voice, each working through the lines of its voice
+        linesByVoice = collections.defaultdict(list)
+        for index, (_, voiceID) in enumerate(lines):
+            linesByVoice[voiceID].append(index)
+        results = [None] * len(lines)
+
+        def synthesizeVoice(voiceID, indices):
+            for index in indices:
+                results[index] = self.synthesize(lines[index][0], voiceID)
+
+        with ThreadPoolExecutor(max_workers=max(len(linesByVoice), 1)) as executor:
+            futures = [executor.submit(synthesizeVoice, voiceID, indices) for voiceID, indices in linesByVoice.items()]
+            for future in futures:
+                future.result()
+        return results
+
+    def close(self):
+        """End all Piper processes and remove the working directory
+        """
+        with self.lock:
+            for worker in self.workers.values():
+                worker.close()
+            self.workers = {}
+        shutil.rmtree(self.workDir, ignore_errors=True)
@@ -44,6 +44,26 @@ class SetupHelper:
         """
         return self.config_values  
 
+    def getMongoDBClientOptions(self, conf: ConfigParser):
+        """Loading the optional options for the shared MongoDB client from config-file
+
+        Args:
+            conf (ConfigParser): Content of config.ini file
+
+        Returns:
+            dict: options for the MongoClient, only containing the configured values
+        """
+        client_options = {}
+        if conf.has_option('MongoDBDatabase', 'db_max_pool_size'):
+            client_options['maxPoolSize'] = conf.getint('MongoDBDatabase', 'db_max_pool_size')
+        if conf.has_option('MongoDBDatabase', 'db_compressors'):
+            client_options['compressors'] = conf.get('MongoDBDatabase', 'db_compressors')
+        if conf.has_option('MongoDBDatabase', 'db_timeout_ms'):
+            timeout = conf.getint('MongoDBDatabase', 'db_timeout_ms')
+            client_options['connectTimeoutMS'] = timeout
+            client_options['serverSelectionTimeoutMS'] = timeout
+        return client_options
+
     def initializePiperConfig(self, conf: ConfigParser, cwd: str): 
         """Loading configs from config-file for PiperTTS
 
@@ -67,7 +87,10 @@ class SetupHelper:
         piper_dir = os.path.join(cwd, conf.get('Paths', 'piper_path'))
         audio_dir = os.path.join(cwd, conf.get('Paths', 'piper_output_path'))
         fullFile_dir = os.path.join(cwd, conf.get('Paths', 'piper_output_fullconversations_path'))
-        piper_exe = os.path.join(piper_dir, "piper.exe")
+        piper_exe = os.path.join(piper_dir, "piper.exe" if os.name == "nt" else "piper")
+        cache_dir = os.path.join(cwd, conf.get('Paths', 'piper_cache_path', fallback='tts_cache'))
+        cache_max_mb = conf.getint('Paths', 'piper_cache_max_mb', fallback=2048)
+        plan_file = os.path.join(cwd, conf.get('Paths', 'piper_plan_path', fallback='synthesis_plan.npz'))
         
         # Create dictionary with values
         config_values = {
@@ -75,13 +98,17 @@ class SetupHelper:
             'db_collection': db_collection,
             'db_host': db_host,
             'db_port': int(db_port),
+            'db_client_options': self.getMongoDBClientOptions(conf),
             'collection_id': collection_id,
             'collection_text': collection_text,
             'script_dir': script_dir,
             'piper_dir': piper_dir,
             'audio_dir': audio_dir,
             'fullFile_dir': fullFile_dir,
-            'piper_exe': piper_exe
+            'piper_exe': piper_exe,
+            'cache_dir': cache_dir,
+            'cache_max_bytes': cache_max_mb * 2**20,
+            'plan_file': plan_file
         }
         return config_values
 
@@ -133,6 +160,8 @@ class SetupHelper:
         req_collection = conf.get('Recapp', 'recapp_req_collection')
         transcript_db = conf.get('STTTranscriptions', 'transcription_db_name')
         transcript_collection = conf.get('STTTranscriptions', 'transcription_collection')
+        max_connections = conf.getint('Recapp', 'max_connections', fallback=4)
+        max_retries = conf.getint('Recapp', 'max_retries', fallback=3)
         
         # Create dictionary with values
         config_values = {
@@ -140,8 +169,11 @@ class SetupHelper:
             'model': model,
             'token': token,
             'api': api_url,
+            'max_connections': max_connections,
+            'max_retries': max_retries,
             'db_host': db_host,
             'db_port': int(db_port),
+            'db_client_options': self.getMongoDBClientOptions(conf),
             'recapp_db_name': recapp_db_name,
             'req_collection': req_collection,
             'transcript_db': transcript_db,
@@ -172,6 +204,7 @@ class SetupHelper:
             'output_dir': output_dir,
             'db_host': db_host,
             'db_port': int(db_port),
+            'db_client_options': self.getMongoDBClientOptions(conf),
             'transcript_db': transcript_db,
             'transcript_collection': transcript_collection
         }
@@ -191,6 +224,7 @@ class SetupHelper:
             'output_dir': output_dir,
             'db_host': db_host,
             'db_port': int(db_port),
+            'db_client_options': self.getMongoDBClientOptions(conf),
             'transcript_db': transcript_db,
             'transcript_collection': transcript_collection
         }
@@ -221,6 +255,7 @@ class SetupHelper:
             'model_path': model_path,
             'db_host': db_host,
             'db_port': int(db_port),
+            'db_client_options': self.getMongoDBClientOptions(conf),
             'transcript_db': transcript_db,
             'transcript_collection': transcript_collection
         }
@@ -252,6 +287,7 @@ class SetupHelper:
             'db_collection': db_collection,
             'db_host': db_host,
             'db_port': int(db_port),
+            'db_client_options': self.getMongoDBClientOptions(conf),
             'collection_id': collection_id,
             'collection_text': collection_text,
             'transcript_db': transcript_db,
@@ -0,0 +1,128 @@
+import os
+import tempfile
+import numpy as np
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+from utils.piper_dialog_handler import PiperDialogHandler
+
+_workerDialogHandler = None
+
+def initPlanWorker(logLevel: int):
+    """Initialize a worker process with its own PiperDialogHandler, keeping its parsed speakers between dialogues
+
+    Args:
+        logLevel (int): Log level of the PiperDialogHandler
+    """
+    global _workerDialogHandler
+    _workerDialogHandler = PiperDialogHandler(logLevel)
+
+def parseDialogueWorker(conversationID: str, dialogRawText: str):
+    """Parse one dialogue and assign the voices inside a worker process
+
+    Args:
+        conversationID (str): ID of the conversation
+        dialogRawText (str): Raw text of the dialogue
+
+    Returns:
+        str: ID of the conversation
+        list: Tuples of line index, Voice-ID and text
+    """
+    dialog, _, _ = _workerDialogHandler.initDialogue(conversationID, dialogRawText)
+    return conversationID, [(element.element_id, element.voice, element.text) for element in dialog]
+
+class SynthesisPlan:
+    CONST_BATCH_SIZE = 256 # Dialogues handed to the pool at once, bounding what is held in memory while streaming
+    CONST_CHUNK_SIZE = 16 # Dialogues sent to a worker per task
+
+    def __init__(self, conversations: np.ndarray, lineIndexes: np.ndarray, voices: np.ndarray, texts: list):
+        """All lines to be synthesized with their voice, stored column by column
+
+        Args:
+            conversations (np.ndarray): ID of the conversation per line
+            lineIndexes (np.ndarray): Index of the line in its dialogue
+            voices (np.ndarray): Voice-ID per line
+            texts (list): Text per line
+        """
+        self.conversations = conversations
+        self.lineIndexes = lineIndexes
+        self.voices = voices
+        self.texts = texts
+
+    def __len__(self):
+        return len(self.lineIndexes)
+
+    @classmethod
+    def build(cls, mongodb_handler, idField: str, textField: str, workers: int = None, logLevel: int = PiperDialogHandler.CONST_LOG_WARNING):
+        """Stream all dialogues from MongoDB, fetching only ID and text, and parse them across a pool of processes
+
+        Args:
+            mongodb_handler (MongoDBHandler): Handler of the collection with the source dialogues
+            idField (str): Field with the ID of the conversation
+            textField (str): Field with the text of the dialogue
+            workers (int, optional): Number of processes. Defaults to the number of CPUs.
+            logLevel (int, optional): Log level of the PiperDialogHandlers in the workers. Defaults to CONST_LOG_WARNING.
+
+        Returns:
+            SynthesisPlan: Plan of all dialogues
+        """
+        conversations, lineIndexes, voices, texts = [], [], [], []
+        dialogues = ((item[idField], item[textField]) for item in mongodb_handler.iterQuery({}, {idField: 1, textField: 1, "_id": 0})
+                     if idField in item and textField in item)
+        numOfDialogues = 0
+        with ProcessPoolExecutor(max_workers=workers, initializer=initPlanWorker, initargs=(logLevel,)) as executor:
+            while batch := list(islice(dialogues, cls.CONST_BATCH_SIZE)):
+                for conversationID, lines in executor.map(parseDialogueWorker, *zip(*batch), chunksize=cls.CONST_CHUNK_SIZE):
+                    for lineIndex, voice, text in lines:
+                        conversations.append(str(conversationID))
+                        lineIndexes.append(lineIndex)
+                        voices.append(voice)
+                        texts.append(text)
+                numOfDialogues += len(batch)
+                print(f"Parsed {numOfDialogues} dialogues, {len(lineIndexes)} lines")
+        return cls(np.array(conversations, dtype=np.str_), np.array(lineIndexes, dtype=np.int32), np.array(voices, dtype=np.int16), texts)
+
+    def save(self, path: str):
+        """Save the plan as compressed columns. Texts are kept as one UTF-8 buffer with offsets, not padded to the longest line
+
+        Args:
+            path (str): Path to the plan (.npz)
+        """
+        encoded = [text.encode("utf-8") for text in self.texts]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(text) for text in encoded], out=offsets[1:])
+        # Write to a temporary file first, so an interrupted run leaves the previous plan intact
+        fd, tempPath = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".npz")
+        with os.fdopen(fd, "wb") as f:
+            np.savez_compressed(f, conversations=self.conversations, lineIndexes=self.lineIndexes, voices=self.voices,
+                                textData=np.frombuffer(b"".join(encoded), dtype=np.uint8), textOffsets=offsets)
+        os.replace(tempPath, path)
+        print(f"Saved synthesis plan with {len(self)} lines to {path}")
+
+    @classmethod
+    def load(cls, path: str):
+        """Load a saved plan
+
+        Args:
+            path (str): Path to the plan (.npz)
+
+        Returns:
+            SynthesisPlan: Loaded plan
+        """
+        with np.load(path) as data:
+            textData = data["textData"].tobytes()
+            offsets = data["textOffsets"]
+            texts = [textData[start:end].decode("utf-8") for start, end in zip(offsets[:-1], offsets[1:])]
+            return cls(data["conversations"], data["lineIndexes"], data["voices"], texts)
+
+    def iterConversations(self):
+        """Iterate over the conversations in the order of the plan
+
+        Yields:
+            str: ID of the conversation
+            list: Tuples of line index, Voice-ID and text
+        """
+        start = 0
+        for end in range(1, len(self) + 1):
+            if end == len(self) or self.conversations[end] != self.conversations[start]:
+                yield str(self.conversations[start]), [(int(self.lineIndexes[i]), int(self.voices[i]), self.texts[i]) for i in range(start, end)]
+                start = end
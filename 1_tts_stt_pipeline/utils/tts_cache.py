@@ -0,0 +1,190 @@
+import os
+import re
+import json
+import struct
+import hashlib
+import tempfile
+import threading
+import unicodedata
+import numpy as np
+from utils.audio_array import AudioArray
+
+class TTSCache:
+    CONST_MAGIC = b"PCM1" # Marks the files of this cache
+    CONST_HEADER = struct.Struct("<4sIH") # Magic, framerate, channels
+    CONST_FILE_EXTENSION = ".pcm"
+    CONST_EVICTION_TARGET = 0.9 # Share of the maximum size to evict down to, so eviction is not run on every write
+
+    def __init__(self, cacheDir: str, maxBytes: int):
+        """On-disk cache of synthesized utterances, addressed by the hash of everything that changes the audio
+
+        Args:
+            cacheDir (str): Directory of the cache, can be shared between runs and machines
+            maxBytes (int): Maximum size of the cache in bytes, the least recently used utterances are evicted beyond it
+        """
+        self.cacheDir = cacheDir
+        self.maxBytes = maxBytes
+        self.hits = 0
+        self.misses = 0
+        self.printedHits = self.printedMisses = 0 # Counts at the last printStats, so every print covers only the requests since
+        self.lock = threading.Lock()
+        os.makedirs(self.cacheDir, exist_ok=True)
+        self.size = sum(size for _, size, _ in self.listEntries())
+
+    def normalizeText(self, text: str):
+        """Normalize text so that spelling variants which sound the same share an entry
+
+        Args:
+            text (str): Text to be synthesized
+
+        Returns:
+            str: Normalized text
+        """
+        return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text)).strip()
+
+    def getKey(self, text: str, modelFile: str, version: str, params: dict = None):
+        """Hash the normalized text, the voice model and the Piper version and parameters
+
+        Args:
+            text (str): Text to be synthesized
+            modelFile (str): Path to the voice model
+            version (str): Version of Piper
+            params (dict, optional): Parameters passed to Piper. Defaults to None.
+
+        Returns:
+            str: Key of the utterance
+        """
+        content = json.dumps([self.normalizeText(text), os.path.normpath(modelFile), version, params or {}], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def getPath(self, key: str):
+        """Path of an entry, spread over subfolders by the first characters of the key
+
+        Args:
+            key (str): Key of the utterance
+
+        Returns:
+            str: Path to the entry
+        """
+        return os.path.join(self.cacheDir, key[:2], key + self.CONST_FILE_EXTENSION)
+
+    def get(self, key: str):
+        """Return a cached utterance and mark it as recently used
+
+        Args:
+            key (str): Key of the utterance
+
+        Returns:
+            AudioArray: Cached audio or None, if it is not cached
+        """
+        path = self.getPath(key)
+        try:
+            with open(path, "rb") as f:
+                magic, frameRate, channels = self.CONST_HEADER.unpack(f.read(self.CONST_HEADER.size))
+                samples = np.frombuffer(f.read(), dtype="<i2")
+        except (FileNotFoundError, struct.error):
+            magic = None
+        else:
+            try:
+                # The modification time serves as the time of last use for the LRU eviction
+                os.utime(path)
+            except OSError:
+                # Read-only cache: the entry is still valid, it only ages for the eviction
+                pass
+        if magic != self.CONST_MAGIC:
+            with self.lock:
+                self.misses += 1
+            return None
+        with self.lock:
+            self.hits += 1
+        return AudioArray(samples.reshape(-1, channels), frameRate)
+
+    def put(self, key: str, audio: AudioArray):
+        """Store an utterance as 16bit PCM with a small header
+
+        Args:
+            key (str): Key of the utterance
+            audio (AudioArray): Synthesized audio
+        """
+        path = self.getPath(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = self.CONST_HEADER.pack(self.CONST_MAGIC, audio.frameRate, audio.channels) + audio.toInt16().samples.astype("<i2", copy=False).tobytes()
+        # Write to a temporary file first, so other processes never read a half written entry
+        fd, tempPath = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        # An overwritten entry no longer counts towards the size
+        try:
+            oldSize = os.stat(path).st_size
+        except FileNotFoundError:
+            oldSize = 0
+        os.replace(tempPath, path)
+        with self.lock:
+            self.size += len(data) - oldSize
+            evict = self.size > self.maxBytes
+        if evict:
+            self.evict()
+
+    def listEntries(self):
+        """List all entries of the cache
+
+        Yields:
+            str: Path to the entry
+            int: Size in bytes
+            float: Time of last use
+        """
+        for shard in os.scandir(self.cacheDir):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(self.CONST_FILE_EXTENSION):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    yield entry.path, stat.st_size, stat.st_mtime
+
+    def evict(self):
+        """Remove the least recently used entries until the cache is below its target size
+        """
+        with self.lock:
+            # Re-read the directory, other processes may share the cache
+            entries = sorted(self.listEntries(), key=lambda entry: entry[2])
+            self.size = sum(size for _, size, _ in entries)
+            target = self.maxBytes * self.CONST_EVICTION_TARGET
+            removed = 0
+            for path, size, _ in entries:
+                if self.size <= target:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                self.size -= size
+                removed += 1
+        print(f"Evicted {removed} utterances from the TTS cache, {self.size / 2**20:.1f} MB left")
+
+    def getStats(self):
+        """Return how well the cache performed
+
+        Returns:
+            dict: Hits, misses, hit rate and size in bytes
+        """
+        with self.lock:
+            requests = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRate": self.hits / requests if requests else 0.0,
+                "size": self.size
+            }
+
+    def printStats(self):
+        """Print the hit rate since the last call (e.g. of one conversation) and of the whole run
+        """
+        stats = self.getStats()
+        hits, misses = stats['hits'] - self.printedHits, stats['misses'] - self.printedMisses
+        self.printedHits, self.printedMisses = stats['hits'], stats['misses']
+        hitRate = hits / (hits + misses) if hits + misses else 0.0
+        print(f"TTS cache: {hits} hits, {misses} misses, hit rate {hitRate:.1%} "
+              f"(run: {stats['hits']} hits, hit rate {stats['hitRate']:.1%}), {stats['size'] / 2**20:.1f} MB used")
@@ -0,0 +1,75 @@
+# Persistent token → medical score cache for mWER (SQLite).
+# Keyed by (token, lexicon version): a run only scores tokens not seen before, the cutoff is applied when the scores are read,
+# and all entries of older lexicon versions are dropped as soon as one of the lexicon CSVs changes.
+import os
+import sqlite3
+from utils.medical_vocab_index import MedicalVocabIndex, lexicon_version
+
+CACHE_FILE = "med_score_cache.sqlite"
+BATCH_SIZE = 500 # Tokens per SELECT/INSERT, stays below SQLite's limit of bound parameters
+
+class MedScoreCache:
+    """Cosine scores of tokens against the medical vocabulary, filled in batches from the MedicalVocabIndex"""
+
+    def __init__(self, lexicon_dir: str = ".", path: str = None):
+        self.lexicon_dir = lexicon_dir
+        self.path = path or os.path.join(lexicon_dir, CACHE_FILE)
+        self.version = lexicon_version(lexicon_dir)
+        self.index = None
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS token_scores (
+                token   TEXT NOT NULL,
+                version TEXT NOT NULL,
+                score   REAL NOT NULL,
+                PRIMARY KEY (token, version)
+            ) WITHOUT ROWID""")
+        # Lexica changed: scores of older versions can never be hit again
+        removed = self.conn.execute("DELETE FROM token_scores WHERE version != ?", (self.version,)).rowcount
+        self.conn.commit()
+        if removed:
+            print(f"{removed} Einträge älterer Lexikon-Versionen aus dem Cache entfernt")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def get_index(self) -> MedicalVocabIndex:
+        """Load (or build) the vocabulary index only when there are tokens to score"""
+        if self.index is None:
+            self.index = MedicalVocabIndex.load_or_build(self.lexicon_dir, version=self.version)
+        return self.index
+
+    def lookup(self, tokens: list) -> dict:
+        """Cached scores of the given tokens, missing tokens are not in the result"""
+        found = {}
+        for start in range(0, len(tokens), BATCH_SIZE):
+            batch = tokens[start:start + BATCH_SIZE]
+            rows = self.conn.execute(
+                f"SELECT token, score FROM token_scores WHERE version = ? AND token IN ({','.join('?' * len(batch))})",
+                (self.version, *batch))
+            found.update(rows)
+        return found
+
+    def get_scores(self, tokens) -> dict:
+        """token → score for all tokens, scoring only cache misses and storing them. The cutoff is applied by the caller"""
+        tokens = sorted(set(tokens))
+        scores = self.lookup(tokens)
+        missing = [tok for tok in tokens if tok not in scores]
+        if missing:
+            index = self.get_index()
+            for start in range(0, len(missing), BATCH_SIZE):
+                new_scores = index.token_scores(missing[start:start + BATCH_SIZE])
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO token_scores (token, version, score) VALUES (?, ?, ?)",
+                    [(tok, self.version, score) for tok, score in new_scores.items()])
+                self.conn.commit()
+                scores.update(new_scores)
+        print(f"Token-Scores: {len(tokens) - len(missing)} aus dem Cache, {len(missing)} neu berechnet")
+        return scores
+
+    def close(self):
+        self.conn.close()
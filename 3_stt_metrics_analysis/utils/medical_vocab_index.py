@@ -0,0 +1,139 @@
+# Persistent character-n-gram TF-IDF index over the merged medical vocabulary (mWER token matching).
+# Tokens are scored against the vocabulary in chunks of a sparse matmul, only the best match per token is kept,
+# so memory stays bounded instead of building the dense token × vocabulary similarity matrix.
+import os
+import re
+import json
+import hashlib
+import joblib
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+LEXICON_FILES = (
+    "lexikon_cleaned_ger_synonyms.csv",
+    "lexikon_ATC-Bedeutung_final_noarticles.csv",
+    "lexikon_deDE15LinguisticVariant_final_noarticles.csv"
+)
+INDEX_DIR  = "med_vocab_index"
+CHUNK_SIZE = 1024
+NON_WORD_PATTERN = re.compile(r"[^\w\säöüß]")
+
+def lexicon_version(lexicon_dir: str = ".") -> str:
+    """SHA-256 over the contents of the three lexicon CSVs, changes whenever one of them changes"""
+    sha = hashlib.sha256()
+    for name in LEXICON_FILES:
+        sha.update(name.encode("utf-8"))
+        with open(os.path.join(lexicon_dir, name), "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                sha.update(block)
+    return sha.hexdigest()
+
+def tokenize_list(phrases):
+    toks = set()
+    for p in phrases:
+        for w in NON_WORD_PATTERN.sub(" ", str(p).lower()).split():
+            if w.isalpha(): toks.add(w)
+    return toks
+
+def load_med_vocab(lexicon_dir: str = ".") -> list:
+    """Merged, sorted medical vocabulary: nouns/adjectives of the synonym lexicon, ATC meanings and components"""
+    cleaned = pd.read_csv(os.path.join(lexicon_dir, LEXICON_FILES[0]))
+    noun_set = set(w for ph in cleaned["only_nouns"].dropna() for w in ph.split())
+    adj_set  = set(w for ph in cleaned["adjectives"].dropna()  for w in ph.split())
+    atc  = pd.read_csv(os.path.join(lexicon_dir, LEXICON_FILES[1]))
+    ling = pd.read_csv(os.path.join(lexicon_dir, LEXICON_FILES[2]))
+    atc_set  = tokenize_list(atc["ATC-Bedeutung_cleaned"].dropna())
+    comp_set = tokenize_list(ling["COMPONENT_cleaned"].dropna())
+    return sorted(noun_set.union(adj_set, atc_set, comp_set))
+
+class MedicalVocabIndex:
+    """Fitted TfidfVectorizer (char_wb, 2-4) and the L2-normalized vocabulary matrix"""
+
+    def __init__(self, vocab: list, vectorizer: TfidfVectorizer, X_vocab, version: str = None):
+        self.vocab = vocab
+        self.vocab_set = set(vocab)
+        self.vectorizer = vectorizer
+        # Transposed once, so every chunk is a plain CSR × CSC product
+        self.X_vocab_T = sparse.csc_matrix(X_vocab.T)
+        self.X_vocab = X_vocab
+        self.version = version
+
+    @classmethod
+    def build(cls, lexicon_dir: str = ".", version: str = None):
+        """Fit the vectorizer on the medical vocabulary of the lexicon CSVs, version is hashed if not given"""
+        vocab = load_med_vocab(lexicon_dir)
+        vectorizer = TfidfVectorizer(analyzer='char_wb', ngram_range=(2,4))
+        X_vocab = vectorizer.fit_transform(vocab).tocsr()
+        print(f"Index aufgebaut: {len(vocab)} Vokabeln, {X_vocab.shape[1]} n-Gramme")
+        return cls(vocab, vectorizer, X_vocab, version or lexicon_version(lexicon_dir))
+
+    def save(self, index_dir: str):
+        """Save vectorizer, vocabulary matrix and vocabulary with the lexicon version"""
+        os.makedirs(index_dir, exist_ok=True)
+        # meta.json first out, last in: an index without it counts as incomplete and is rebuilt,
+        # so a crash while saving never pairs the old meta.json with new files
+        meta_path = os.path.join(index_dir, "meta.json")
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+        joblib.dump(self.vectorizer, os.path.join(index_dir, "vectorizer.joblib"))
+        sparse.save_npz(os.path.join(index_dir, "X_vocab.npz"), self.X_vocab)
+        with open(os.path.join(index_dir, "vocab.json"), "w", encoding="utf-8") as f:
+            json.dump(self.vocab, f, ensure_ascii=False)
+        with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"version": self.version, "size": len(self.vocab)}, f)
+        os.replace(meta_path + ".tmp", meta_path)
+
+    @classmethod
+    def load(cls, index_dir: str):
+        with open(os.path.join(index_dir, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        with open(os.path.join(index_dir, "vocab.json"), encoding="utf-8") as f:
+            vocab = json.load(f)
+        vectorizer = joblib.load(os.path.join(index_dir, "vectorizer.joblib"))
+        X_vocab = sparse.load_npz(os.path.join(index_dir, "X_vocab.npz")).tocsr()
+        return cls(vocab, vectorizer, X_vocab, meta["version"])
+
+    @classmethod
+    def load_or_build(cls, lexicon_dir: str = ".", index_dir: str = None, version: str = None):
+        """Reuse the saved index if it was built from the current lexica, otherwise rebuild and save it.
+        The lexicon version is hashed if the caller has not already done so."""
+        index_dir = index_dir or os.path.join(lexicon_dir, INDEX_DIR)
+        version = version or lexicon_version(lexicon_dir)
+        meta_path = os.path.join(index_dir, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path, encoding="utf-8") as f:
+                if json.load(f).get("version") == version:
+                    print(f"Index geladen aus {index_dir}")
+                    return cls.load(index_dir)
+        index = cls.build(lexicon_dir, version)
+        index.save(index_dir)
+        return index
+
+    def top1(self, tokens: list, chunk_size: int = CHUNK_SIZE) -> tuple:
+        """
+        Best vocabulary match and its cosine score for every token.
+        TF-IDF rows are L2-normalized, so the sparse dot product is the cosine similarity.
+        Returns (best_idx, best_score) as arrays.
+        """
+        best_idx = np.zeros(len(tokens), dtype=np.int64)
+        best_score = np.zeros(len(tokens), dtype=np.float64)
+        for start in range(0, len(tokens), chunk_size):
+            sims = (self.vectorizer.transform(tokens[start:start + chunk_size]) @ self.X_vocab_T).tocsr()
+            best_idx[start:start + chunk_size] = np.asarray(sims.argmax(axis=1)).ravel()
+            best_score[start:start + chunk_size] = sims.max(axis=1).toarray().ravel()
+        return best_idx, best_score
+
+    def token_scores(self, tokens, chunk_size: int = CHUNK_SIZE) -> dict:
+        """token → max. cosine score against the vocabulary, as token_to_score in mwer_calculate"""
+        tokens = sorted(set(tokens))
+        _, scores = self.top1(tokens, chunk_size)
+        return dict(zip(tokens, scores.tolist()))
+
+    def best_match_and_score(self, tokens, chunk_size: int = CHUNK_SIZE) -> list:
+        """(best_match, cosine_score) per token, exact vocabulary hits score 1.0"""
+        tokens = list(tokens)
+        best_idx, scores = self.top1(tokens, chunk_size)
+        return [(tok, 1.0) if tok in self.vocab_set else (self.vocab[i], float(s))
+                for tok, i, s in zip(tokens, best_idx, scores)]
@@ -0,0 +1,59 @@
+# Bulk re-preprocessing of the metric fields in transcripts_denis.
+# Only text/srcText are fetched, every distinct reference is normalized once and the results are written in batched bulk_writes.
+from pymongo import MongoClient, UpdateOne
+from utils.text_normalize import VARIANTS, preprocess_all
+
+MONGO_URI  = "mongodb://localhost:27018/"
+DB_NAME    = "transcriptions"
+COLL_NAME  = "transcripts_denis"
+BATCH_SIZE = 1000
+
+def field_names(variant: str) -> tuple:
+    """Return the (hypothesis, reference) field names of a metric variant, e.g. text_lex_denis/src_lex_denis"""
+    return f"text_{variant}_denis", f"src_{variant}_denis"
+
+def refresh_metric_fields(coll, variants=("lex",), query: dict = None, batch_size: int = BATCH_SIZE) -> dict:
+    """
+    Recompute the preprocessed fields of the given variants for all matching documents.
+    - Projection on _id/text/srcText, rawTranscriptData etc. are never transferred
+    - srcText repeats across every engine × ambient × volume variant, so each distinct reference is normalized only once,
+      hypotheses are (nearly) unique and normalized directly
+    - $set replaces the old values, no separate $unset round trip
+    """
+    unknown = set(variants) - set(VARIANTS)
+    if unknown:
+        raise ValueError(f"Unknown variants {unknown}, available: {VARIANTS}")
+    src_cache = {}
+    ops = []
+    stats = {"documents": 0, "modified": 0, "unique_src": 0}
+    for doc in coll.find(query or {}, {"_id": 1, "text": 1, "srcText": 1}):
+        hyp = preprocess_all(doc.get("text", "") or "")
+        src_text = doc.get("srcText", "") or ""
+        if src_text not in src_cache:
+            src_cache[src_text] = preprocess_all(src_text)
+        ref = src_cache[src_text]
+        update = {}
+        for variant in variants:
+            text_field, src_field = field_names(variant)
+            update[text_field] = hyp[variant]
+            update[src_field] = ref[variant]
+        ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": update}))
+        if len(ops) >= batch_size:
+            stats["modified"] += coll.bulk_write(ops, ordered=False).modified_count
+            stats["documents"] += len(ops)
+            ops = []
+    if ops:
+        stats["modified"] += coll.bulk_write(ops, ordered=False).modified_count
+        stats["documents"] += len(ops)
+    stats["unique_src"] = len(src_cache)
+    print(f"{stats['documents']} Dokumente aktualisiert ({stats['modified']} geändert), "
+          f"{stats['unique_src']} verschiedene Referenztexte, Felder: {', '.join(variants)}")
+    return stats
+
+def run_refresh(variants=("lex",), query: dict = None, batch_size: int = BATCH_SIZE, uri: str = MONGO_URI) -> dict:
+    """Connect to the transcripts collection and refresh the given variants"""
+    client = MongoClient(uri)
+    try:
+        return refresh_metric_fields(client[DB_NAME][COLL_NAME], variants, query, batch_size)
+    finally:
+        client.close()
@@ -0,0 +1,180 @@
+# Shared text normalization for all metric preprocessors (WER, lexical/semantic cosine, BLEU, MEER).
+# Patterns and translate tables are compiled once at import, spaCy is only loaded when truecasing is needed.
+import re
+import string
+from functools import lru_cache
+from num2words import num2words
+from jiwer import (
+    Compose, Strip, RemoveWhiteSpace, RemovePunctuation,
+    ToLowerCase, RemoveMultipleSpaces, RemoveEmptyStrings,
+    SubstituteWords, ReduceToListOfListOfWords
+)
+# Same set as nlp.Defaults.stop_words of de_core_news_lg, without loading the model
+from spacy.lang.de.stop_words import STOP_WORDS as SPACY_STOPWORDS
+
+SPACY_MODEL = "de_core_news_lg"
+# Truecasing only needs the POS tags, parser, NER and lemmatizer are never loaded
+SPACY_EXCLUDE = ["parser", "ner", "lemmatizer"]
+# ASR models without native casing, their transcripts are truecased for NER
+TRUECASE_MODELS = {"vosk-model-de-0.21", "whisper_rescuespeech"}
+VARIANTS = ("wer", "lex", "sem", "bleu")
+
+ABBREV_PATTERNS = [
+    (re.compile(r"\bz\. b\.?\b", re.IGNORECASE), "zum beispiel"),
+    (re.compile(r"\bdr\.?\b", re.IGNORECASE), "doktor")
+]
+RATIO_PATTERN = re.compile(r"\b(\d+)\s*/\s*(\d+)\b")
+DECIMAL_PATTERN = re.compile(r"\b(\d+)([.,])(\d+)\b")
+INTEGER_PATTERN = re.compile(r"\b(\d+)\b")
+
+UMLAUT_TABLE = str.maketrans({
+    'ä': 'ae', 'ö': 'oe', 'ü': 'ue',
+    'Ä': 'Ae', 'Ö': 'Oe', 'Ü': 'Ue', 'ß': 'ss'
+})
+PUNCT_TABLE = str.maketrans("", "", string.punctuation)
+SENTENCE_END = {".", "!", "?"}
+
+# jiwer–Pipeline für WER/CER/SER
+def get_wer_transforms():
+    return Compose([
+        Strip(),
+        RemoveWhiteSpace(replace_by_space=True),
+        SubstituteWords({
+            "z. b.": "zum beispiel",
+            "dr.":   "doktor"
+        }),
+        RemovePunctuation(),
+        ToLowerCase(),
+        RemoveMultipleSpaces(),
+        RemoveEmptyStrings(),
+        ReduceToListOfListOfWords()
+    ])
+
+def norm_base(text: str) -> str:
+    """Replace linebreaks, lowercase and normalize whitespace"""
+    # str.split() without arguments already splits on \r and \n
+    return " ".join(text.lower().split())
+
+def expand_abbrev_custom(text: str) -> str:
+    """Expand common German abbreviations"""
+    for pattern, full in ABBREV_PATTERNS:
+        text = pattern.sub(full, text)
+    return text
+
+def normalize_umlaute(text: str) -> str:
+    """Convert German umlauts and ß into ASCII equivalents"""
+    return text.translate(UMLAUT_TABLE)
+
+def remove_punct(text: str) -> str:
+    """Remove punctuation characters"""
+    return text.translate(PUNCT_TABLE)
+
+@lru_cache(maxsize=None)
+def number_to_words(number: str, lang: str = 'de') -> str:
+    """Spell out a number, every distinct number is converted only once"""
+    return num2words(int(number), lang=lang)
+
+def expand_slash_ratios(text: str) -> str:
+    """Replace numerical ratios X/Y with 'X über Y'"""
+    return RATIO_PATTERN.sub(r"\1 über \2", text)
+
+def expand_numbers(text: str, lang: str = 'de') -> str:
+    """
+    Expand numeric tokens into words:
+      1) Dezimalzahlen mit Punkt: '97.9' → 'siebenundneunzig punkt neun'
+      2) Dezimalzahlen mit Komma: '97,9' → 'siebenundneunzig komma neun'
+      3) Ganze Zahlen: '65' → 'fünfundsechzig'
+    """
+    # Without digits there is nothing to expand
+    if not any(c.isdigit() for c in text):
+        return text
+    # Verhältnisse zuerst
+    text = expand_slash_ratios(text)
+    # Dezimalzahlen
+    def repl_decimal(m):
+        sep_word = "punkt" if m.group(2) == "." else "komma"
+        return f"{number_to_words(m.group(1), lang)} {sep_word} {number_to_words(m.group(3), lang)}"
+    text = DECIMAL_PATTERN.sub(repl_decimal, text)
+    # Ganze Zahlen
+    return INTEGER_PATTERN.sub(lambda m: number_to_words(m.group(1), lang), text)
+
+def preprocess_all(text: str) -> dict:
+    """
+    Build all metric variants of a text in one pass, sharing the common steps:
+      sem  = norm_base
+      wer  = sem + abbreviations + umlauts + numbers - punctuation
+      lex  = wer without spaCy stopwords
+      bleu = sem + abbreviations + numbers, punctuation and umlauts are left to sacrebleu's 13a tokenizer
+             (text_bleu_denis/src_bleu_denis, read by bleu_statistics/preprocessingfix_bleu.ipynb)
+    """
+    sem = norm_base(text)
+    abbrev = expand_abbrev_custom(sem)
+    wer = remove_punct(expand_numbers(normalize_umlaute(abbrev)))
+    return {
+        "wer":  wer,
+        "lex":  " ".join(tok for tok in wer.split() if tok not in SPACY_STOPWORDS),
+        "sem":  sem,
+        "bleu": expand_numbers(abbrev)
+    }
+
+def preprocess_text_for_wer(text: str) -> str:
+    return preprocess_all(text)["wer"]
+
+def preprocess_text_for_lexical_cosine(text: str) -> str:
+    return preprocess_all(text)["lex"]
+
+def preprocess_text_for_semantic_cosine(text: str) -> str:
+    """Minimal preprocessing: normalize whitespace & lowercase"""
+    return norm_base(text)
+
+def preprocess_text_for_bleu(text: str) -> str:
+    return preprocess_all(text)["bleu"]
+
+@lru_cache(maxsize=None)
+def get_nlp(model: str = SPACY_MODEL):
+    """Load the spaCy model once per process, only with the components needed for POS tags"""
+    import spacy
+    return spacy.load(model, exclude=SPACY_EXCLUDE)
+
+def truecase_doc(doc) -> str:
+    """Lowercase-Then-Truecase basierend auf POS: Satzanfang & Substantive/Eigenname"""
+    result = []
+    capitalize_next = True
+    for token in doc:
+        # Satzanfang oder Substantiv/Eigenname groß
+        if capitalize_next or token.pos_ in {"NOUN", "PROPN"}:
+            result.append(token.text.capitalize())
+        else:
+            result.append(token.text)
+        capitalize_next = token.text in SENTENCE_END
+    return " ".join(result)
+
+def truecase_texts(texts: list, n_process: int = 1, batch_size: int = 256) -> list:
+    """Truecase many texts, streamed through nlp.pipe instead of one document at a time"""
+    nlp = get_nlp()
+    docs = nlp.pipe((text.lower() for text in texts), n_process=n_process, batch_size=batch_size)
+    return [truecase_doc(doc) for doc in docs]
+
+def truecase_text(text: str) -> str:
+    """Lowercase-Then-Truecase basierend auf POS: Satzanfang & Substantive/Eigenname"""
+    return truecase_texts([text])[0]
+
+def preprocess_texts_for_ner_meer(texts: list, models: list, n_process: int = 1, batch_size: int = 256) -> list:
+    """
+    Minimal preprocessing for BERT-based NER models (MEER), for many texts at once.
+    - Strip + normalize whitespace
+    - Truecase für model-specific cases, all in one nlp.pipe run
+    """
+    cleaned = [" ".join(text.strip().split()) for text in texts]
+    to_truecase = [i for i, model in enumerate(models) if model in TRUECASE_MODELS]
+    for i, truecased in zip(to_truecase, truecase_texts([cleaned[i] for i in to_truecase], n_process, batch_size)):
+        cleaned[i] = truecased
+    return cleaned
+
+def preprocess_text_for_ner_meer(text: str, model: str) -> str:
+    """
+    Minimal preprocessing for BERT-based NER models (MEER).
+    - Strip + normalize whitespace
+    - Truecase für model-specific cases
+    """
+    return preprocess_texts_for_ner_meer([text], [model])[0]
@@ -0,0 +1,153 @@
+# Batch WER/CER/m-WER scoring with one cached alignment per (ref, hyp) pair.
+# The Levenshtein alignment runs in rapidfuzz's compiled kernel (the one jiwer uses) across a process pool,
+# WER, S/D/I, the phrase-level error counts, the token-source export and m-WER are all derived from the cached ops.
+import re
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from rapidfuzz.distance import Levenshtein
+
+MED_CUTOFF = 0.80
+CHUNKSIZE  = 64
+
+# Opcode tags, stored as int8 in the ops array
+EQUAL, SUBSTITUTE, DELETE, INSERT = 0, 1, 2, 3
+TAG_CODES = {"equal": EQUAL, "replace": SUBSTITUTE, "delete": DELETE, "insert": INSERT}
+MULTIPLE_SPACES = re.compile(r"\s\s+")
+NON_WORD_PATTERN = re.compile(r"[^\w\s]")
+
+def normalize_simple(text: str) -> str:
+    """Lowercase, replace all non-word characters by spaces and normalize whitespace"""
+    return " ".join(NON_WORD_PATTERN.sub(" ", text.lower()).split())
+
+def split_words(text: str) -> list:
+    """Split like jiwer's wer_default: RemoveMultipleSpaces, Strip, ReduceToListOfListOfWords"""
+    return [w for w in MULTIPLE_SPACES.sub(" ", text).strip().split(" ") if w]
+
+class Alignment:
+    """Word alignment of one ref/hyp pair: the words and the opcodes (tag, i1, i2, j1, j2) as int32 array"""
+    __slots__ = ("ref_words", "hyp_words", "ops")
+
+    def __init__(self, ref_words: list, hyp_words: list, ops: np.ndarray):
+        self.ref_words = ref_words
+        self.hyp_words = hyp_words
+        self.ops = ops
+
+    def counts(self) -> tuple:
+        """Word-level (hits, substitutions, deletions, insertions)"""
+        tags, ref_len, hyp_len = self.ops[:, 0], self.ops[:, 2] - self.ops[:, 1], self.ops[:, 4] - self.ops[:, 3]
+        return (int(ref_len[tags == EQUAL].sum()), int(ref_len[tags == SUBSTITUTE].sum()),
+                int(ref_len[tags == DELETE].sum()), int(hyp_len[tags == INSERT].sum()))
+
+    @property
+    def wer(self) -> float:
+        """Word error rate, with jiwer's edge case for an empty reference"""
+        H, S, D, I = self.counts()
+        if not self.ref_words:
+            return float(I)
+        return (S + D + I) / (H + S + D)
+
+    def error_counts(self) -> tuple:
+        """Phrase-level error counts like jiwer.collect_error_counts: (substitutions, insertions, deletions)"""
+        subs, ins, dels = defaultdict(int), defaultdict(int), defaultdict(int)
+        for tag, i1, i2, j1, j2 in self.ops.tolist():
+            if tag == INSERT:
+                ins[" ".join(self.hyp_words[j1:j2])] += 1
+            elif tag == DELETE:
+                dels[" ".join(self.ref_words[i1:i2])] += 1
+            elif tag == SUBSTITUTE:
+                subs[(" ".join(self.ref_words[i1:i2]), " ".join(self.hyp_words[j1:j2]))] += 1
+        return subs, ins, dels
+
+    def token_sources(self) -> dict:
+        """Error phrases with their source (ref/hyp), as exported to wer_token_sources.json"""
+        subs, ins, dels = self.error_counts()
+        return {
+            "wer": self.wer,
+            "subs_ref_tokens": [r for (r, h), cnt in subs.items() for _ in range(cnt)],
+            "subs_hyp_tokens": [h for (r, h), cnt in subs.items() for _ in range(cnt)],
+            "del_ref_tokens":  [r for r, cnt in dels.items() for _ in range(cnt)],
+            "ins_hyp_tokens":  [h for h, cnt in ins.items() for _ in range(cnt)]
+        }
+
+    def mwer_stats(self, token_to_score, cutoff: float = MED_CUTOFF) -> dict:
+        """
+        Phrase-level WER and m-WER: an error phrase counts as medical if one of its words scores ≥ cutoff.
+        Denominator of m-WER = number of medical words in the reference.
+        """
+        subs, ins, dels = self.error_counts()
+        is_med = lambda w: token_to_score.get(w, 0.0) >= cutoff
+        med_phrase = lambda phrase: any(is_med(w) for w in phrase.split())
+        S_med = sum(cnt for (ref_ph, _), cnt in subs.items() if med_phrase(ref_ph))
+        D_med = sum(cnt for ref_ph, cnt in dels.items() if med_phrase(ref_ph))
+        I_med = sum(cnt for hyp_ph, cnt in ins.items() if med_phrase(hyp_ph))
+        total_med_ref = sum(1 for w in self.ref_words if is_med(w))
+        return {
+            "wer":   self.wer,
+            "S":     sum(subs.values()),
+            "D":     sum(dels.values()),
+            "I":     sum(ins.values()),
+            "S_med": S_med,
+            "D_med": D_med,
+            "I_med": I_med,
+            "mwer":  (S_med + D_med + I_med) / total_med_ref if total_med_ref else 0.0
+        }
+
+def align(ref: str, hyp: str) -> Alignment:
+    """Align one pair on word level, words are mapped to integers for the compiled kernel"""
+    ref_words, hyp_words = split_words(ref), split_words(hyp)
+    vocab = {}
+    ref_ints = [vocab.setdefault(w, len(vocab)) for w in ref_words]
+    hyp_ints = [vocab.setdefault(w, len(vocab)) for w in hyp_words]
+    opcodes = Levenshtein.opcodes(ref_ints, hyp_ints)
+    ops = np.array([(TAG_CODES[op.tag], op.src_start, op.src_end, op.dest_start, op.dest_end) for op in opcodes],
+                   dtype=np.int32).reshape(-1, 5)
+    return Alignment(ref_words, hyp_words, ops)
+
+def align_pair(pair: tuple) -> Alignment:
+    """Pool worker: align one (ref, hyp) pair"""
+    return align(*pair)
+
+def cer(ref: str, hyp: str) -> float:
+    """Character error rate like jiwer's cer_default (Strip, characters incl. spaces)"""
+    ref, hyp = ref.strip(), hyp.strip()
+    if not ref:
+        return float(len(hyp))
+    return Levenshtein.distance(ref, hyp) / len(ref)
+
+class WerEngine:
+    """Scores many ref/hyp pairs, every distinct pair is aligned only once and kept in the cache"""
+
+    def __init__(self, workers: int = None, chunksize: int = CHUNKSIZE):
+        self.workers = workers
+        self.chunksize = chunksize
+        self.cache = {}
+
+    def align_all(self, pairs: list) -> list:
+        """Return the alignments of all (ref, hyp) pairs, computing only the missing ones in the process pool"""
+        missing = list(dict.fromkeys(pair for pair in pairs if pair not in self.cache))
+        if missing:
+            if self.workers == 1 or len(missing) < self.chunksize:
+                aligned = map(align_pair, missing)
+                self.cache.update(zip(missing, aligned))
+            else:
+                with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                    self.cache.update(zip(missing, executor.map(align_pair, missing, chunksize=self.chunksize)))
+        return [self.cache[pair] for pair in pairs]
+
+    def score_all(self, pairs: list, token_to_score=None, cutoff: float = MED_CUTOFF, with_cer: bool = False) -> list:
+        """WER, S/D/I and (with token_to_score) S_med/D_med/I_med/m-WER for every pair, optionally CER"""
+        rows = []
+        for (ref, hyp), alignment in zip(pairs, self.align_all(pairs)):
+            row = alignment.mwer_stats(token_to_score or {}, cutoff)
+            if token_to_score is None:
+                for key in ("S_med", "D_med", "I_med", "mwer"):
+                    del row[key]
+            if with_cer:
+                row["cer"] = cer(ref, hyp)
+            rows.append(row)
+        return rows
+
+    def token_sources_all(self, pairs: list) -> list:
+        """Token-source export (subs/del/ins phrases) of every pair, reusing the cached alignments"""
+        return [alignment.token_sources() for alignment in self.align_all(pairs)]